@@ -3,6 +3,8 @@ from warnings import filterwarnings
 
 import os
 
+from backend import instrument
+
 
 filterwarnings(action='ignore')
 st.set_page_config(page_title='Data Science & Stats', page_icon='📉', layout='centered')
@@ -62,6 +64,38 @@ with col2:
     Discover common misconceptions and gain deeper insights into these fundamental concepts.
     ''')
 
+    st.markdown('''
+    ### 4️⃣ Uber Trips
+    
+    Map half a million Uber pickups across New York City:
+    - Pick any range of days and hours of the day
+    - See where and when the city travels
+    ''')
+
+    st.markdown('''
+    ### 5️⃣ Bootstrap Confidence Intervals
+    
+    Build confidence intervals for any statistic by resampling the data:
+    - Compare **percentile** and **BCa** bootstrap intervals
+    - Check them against the closed form t interval
+    ''')
+
+    st.markdown('''
+    ### 6️⃣ Pearson Correlation and the Fisher Transform
+    
+    Simulate the sampling distribution of the correlation coefficient:
+    - See how the **Fisher transform** makes it normal
+    - Build confidence intervals for the population correlation
+    ''')
+
+    st.markdown('''
+    ### 7️⃣ Principal Component Analysis
+    
+    Reduce the dimensions of a dataset while keeping most of its variance:
+    - See how much of the variance each component explains
+    - Project the cars and penguins data onto the first two components
+    ''')
+
 st.markdown('---')
 
 # Features Section
@@ -115,3 +149,5 @@ st.markdown('''
 ''', unsafe_allow_html=True)
 
 logger.info(f"Current App Version: {os.environ.get('DOCKER_TAG')}")
+
+instrument.debug_panel()
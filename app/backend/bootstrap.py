@@ -0,0 +1,98 @@
+import hashlib
+import os
+from collections import namedtuple
+
+import numpy as np
+from scipy import stats
+
+from backend import instrument, sampling
+from backend.cache import LRUCache
+from backend.sampling import MAX_CHUNK_DRAWS
+
+# Reducers over a batch of resamples: (n_resamples, n) for a single column, (n_resamples, n, k) for rows of
+# k paired columns, all returning one statistic per resample.
+STATISTICS = {
+    'mean': lambda x: x.mean(axis=1),
+    'median': lambda x: np.median(x, axis=1),
+    'std': lambda x: x.std(axis=1, ddof=1),
+    'mean difference': lambda x: x[..., 1].mean(axis=1) - x[..., 0].mean(axis=1),
+}
+
+BootstrapResult = namedtuple('BootstrapResult', ['statistic', 'distribution', 'standard_error', 'percentile', 'bca'])
+
+# bootstrap distributions shared across every session of this process
+RESULTS_CACHE = LRUCache(max_bytes=int(os.environ.get('BOOTSTRAP_CACHE_BYTES', 128 * 2 ** 20)),
+                         name='bootstrap.results')
+
+
+def _reducer(statistic):
+    return STATISTICS[statistic] if isinstance(statistic, str) else statistic
+
+
+def resample_statistics(data, statistic, n_resamples, seed=None, max_chunk_draws=MAX_CHUNK_DRAWS):
+    # The statistic of n_resamples resamples of the rows of data. Resamples are drawn as blocks of index
+    # matrices holding at most max_chunk_draws indices, each block reduced in one vectorized call.
+    data = np.asarray(data, dtype=float)
+    reduce = _reducer(statistic)
+    n = len(data)
+    out = np.empty(n_resamples)
+    for start, stop, rng in sampling.iter_blocks(n_resamples, n, seed, max_chunk_draws):
+        indices = rng.integers(0, n, size=(stop - start, n))
+        out[start:stop] = reduce(data[indices])
+    return out
+
+
+def jackknife_statistics(data, statistic, max_chunk_draws=MAX_CHUNK_DRAWS):
+    # the statistic of data with each row left out in turn, blocks of leave one out index rows at a time
+    data = np.asarray(data, dtype=float)
+    reduce = _reducer(statistic)
+    n = len(data)
+    out = np.empty(n)
+    columns = np.arange(n - 1)
+    for start, stop in sampling.blocks(n, n - 1, max_chunk_draws):
+        left_out = np.arange(start, stop)[:, None]
+        out[start:stop] = reduce(data[columns + (columns >= left_out)])
+    return out
+
+
+def percentile_interval(distribution, confidence=0.95):
+    alpha = (1 - confidence) / 2
+    return tuple(np.quantile(distribution, [alpha, 1 - alpha]))
+
+
+def bca_interval(data, statistic, distribution, confidence=0.95, observed=None, max_chunk_draws=MAX_CHUNK_DRAWS):
+    # Bias corrected and accelerated interval (Efron): the percentile levels are shifted by the bootstrap
+    # bias z0 and the jackknife estimate of the acceleration a.
+    if observed is None:
+        observed = _reducer(statistic)(np.asarray(data, dtype=float)[None])[0]
+    below = np.mean(distribution < observed) + np.mean(distribution == observed) / 2
+    z0 = stats.norm.ppf(below)
+    jackknife = jackknife_statistics(data, statistic, max_chunk_draws)
+    d = jackknife.mean() - jackknife
+    denominator = 6 * np.sum(d ** 2) ** 1.5
+    a = np.sum(d ** 3) / denominator if denominator else 0.0
+    alpha = (1 - confidence) / 2
+    z = stats.norm.ppf([alpha, 1 - alpha])
+    levels = stats.norm.cdf(z0 + (z0 + z) / (1 - a * (z0 + z)))
+    if not np.isfinite(levels).all():
+        # a degenerate distribution (e.g. every resample equal to the observed statistic)
+        return percentile_interval(distribution, confidence)
+    return tuple(np.quantile(distribution, levels))
+
+
+@instrument.timed
+def bootstrap(data, statistic='mean', n_resamples=10_000, confidence=0.95, seed=None,
+              max_chunk_draws=MAX_CHUNK_DRAWS):
+    data = np.asarray(data, dtype=float)
+    observed = _reducer(statistic)(data[None])[0]
+    distribution = resample_statistics(data, statistic, n_resamples, seed, max_chunk_draws)
+    return BootstrapResult(observed, distribution, distribution.std(ddof=1),
+                           percentile_interval(distribution, confidence),
+                           bca_interval(data, statistic, distribution, confidence, observed, max_chunk_draws))
+
+
+def cached_bootstrap(data, statistic, n_resamples, confidence, seed):
+    # only named statistics can be cached, the key has to be the same in every session
+    data = np.ascontiguousarray(data, dtype=float)
+    key = (hashlib.sha1(data.tobytes()).hexdigest(), data.shape, statistic, n_resamples, confidence, seed)
+    return RESULTS_CACHE.get_or_compute(key, lambda: bootstrap(data, statistic, n_resamples, confidence, seed))
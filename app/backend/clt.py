@@ -1,15 +1,57 @@
+import multiprocessing as mp
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
 import numpy as np
 import plotly.express as px
 import plotly.figure_factory as ff
+import plotly.graph_objects as go
 import streamlit as st
+from scipy.fft import next_fast_len, irfft, rfft
+
+from backend import instrument, sampling
+from backend.cache import LRUCache
+from backend.sampling import MAX_CHUNK_DRAWS
 
-VALUES = 'values'
+N_DIST_VALUES = 20
+
+COUNTS = 'counts'
+N_VALUES = 'n_values'
+VALUES_MEAN = 'values_mean'
+VALUES_M2 = 'values_m2'
 DIST_VALS = 'dist_vals'
 PROBS = 'probs'
 SAMPLE_MEANS = 'sample_means'
+SAMPLE_MEANS_PMF = 'sample_means_pmf'
 STD_SAMPLE_MEANS = 'std_sample_means'
 SAMPLE_SIZE = 'sample_size'
 GENERATED_SAMPLE_MEANS = 'generate_sample_means'
+SEED = 'seed'
+
+# every session starts from the same seed so the common distributions are shared through the cache
+DEFAULT_SEED = 0
+
+# simulations smaller than this many draws run in process, where the pool overhead would dominate
+PARALLEL_MIN_DRAWS = 2 ** 24
+N_WORKERS = int(os.environ.get('CLT_WORKERS', os.cpu_count() or 1))
+
+# sample means shown in full with a kde curve, larger simulations are drawn as histograms
+DISTPLOT_MAX_SAMPLES = 10_000
+
+SampleMeansProgress = namedtuple('SampleMeansProgress', ['means', 'mean', 'std', 'hist', 'bin_edges'])
+
+_executor = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+logger = st.logger.get_logger(__name__)
+
+# sample means shared across every session of this process
+SAMPLE_MEANS_CACHE = LRUCache(max_bytes=int(os.environ.get('CLT_CACHE_BYTES', 256 * 2 ** 20)),
+                              name='clt.sample_means')
 
 
 def is_init():
@@ -17,52 +59,232 @@ def is_init():
 
 
 def init():
-    st.session_state[VALUES] = []
-    st.session_state[DIST_VALS] = np.array([])
-    st.session_state[PROBS] = np.array([])
+    st.session_state[COUNTS] = np.zeros(N_DIST_VALUES, dtype=np.int64)
+    st.session_state[N_VALUES] = 0
+    st.session_state[VALUES_MEAN] = 0.0
+    st.session_state[VALUES_M2] = 0.0
+    st.session_state[DIST_VALS] = np.arange(1, N_DIST_VALUES + 1)
+    st.session_state[PROBS] = np.zeros(N_DIST_VALUES)
     st.session_state[SAMPLE_MEANS] = np.array([])
+    st.session_state[SAMPLE_MEANS_PMF] = None
     st.session_state[STD_SAMPLE_MEANS] = np.array([])
     st.session_state[SAMPLE_SIZE] = 0
     st.session_state[GENERATED_SAMPLE_MEANS] = False
+    st.session_state[SEED] = DEFAULT_SEED
 
 
 def update_distribution(i):
-    st.session_state[VALUES].append(i)
-    values, counts = np.unique(st.session_state[VALUES], return_counts=True)
-    st.session_state[DIST_VALS] = values
-    st.session_state[PROBS] = counts / counts.sum()
+    st.session_state[COUNTS][i - 1] += 1
+    st.session_state[N_VALUES] += 1
+    # Welford's update keeps the moments current without revisiting earlier clicks
+    delta = i - st.session_state[VALUES_MEAN]
+    st.session_state[VALUES_MEAN] += delta / st.session_state[N_VALUES]
+    st.session_state[VALUES_M2] += delta * (i - st.session_state[VALUES_MEAN])
+    st.session_state[PROBS] = st.session_state[COUNTS] / st.session_state[N_VALUES]
+
+
+def load_distribution(counts=None, observations=None):
+    if observations is not None:
+        counts = np.bincount(np.asarray(observations) - 1, minlength=N_DIST_VALUES)
+    counts = np.asarray(counts, dtype=np.int64)
+    if counts.shape != (N_DIST_VALUES,) or np.any(counts < 0):
+        raise ValueError(f'A distribution is made of {N_DIST_VALUES} non-negative counts for the values '
+                         f'1 to {N_DIST_VALUES}.')
+    init()
+    n_values = counts.sum()
+    if n_values == 0:
+        return
+    dist_vals = st.session_state[DIST_VALS]
+    mean = counts @ dist_vals / n_values
+    st.session_state[COUNTS] = counts
+    st.session_state[N_VALUES] = int(n_values)
+    st.session_state[VALUES_MEAN] = mean
+    st.session_state[VALUES_M2] = counts @ (dist_vals - mean) ** 2
+    st.session_state[PROBS] = counts / n_values
 
 
 def clear_distribution():
     init()
 
 
+def resample():
+    st.session_state[SEED] += 1
+
+
 def has_distribution():
-    return len(np.unique(st.session_state[DIST_VALS])) > 1
+    return np.count_nonzero(st.session_state[COUNTS]) > 1
+
+
+def _sample_blocks(n_support, sample_size, n_samples, max_chunk_draws):
+    # a sample is fully described by how many times each value was drawn, so once the
+    # sample is larger than the support it is cheaper to draw the counts than the values
+    use_counts = sample_size > n_support
+    row_draws = n_support if use_counts else sample_size
+    return sampling.blocks(n_samples, row_draws, max_chunk_draws), use_counts, n_samples * row_draws
+
+
+def _get_executor(n_workers):
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != n_workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ProcessPoolExecutor(max_workers=n_workers, mp_context=mp.get_context('spawn'))
+            _executor_workers = n_workers
+        return _executor
+
+
+def _fill_blocks_parallel(dist_vals, probs, sample_size, use_counts, blocks, seeds, means, n_workers):
+    executor = _get_executor(n_workers)
+    shm = shared_memory.SharedMemory(create=True, size=means.nbytes)
+    futures = []
+    try:
+        futures = [executor.submit(sampling.simulate_shared_block, shm.name, len(means), start, stop,
+                                   dist_vals, probs, sample_size, use_counts, seed)
+                   for (start, stop), seed in zip(blocks, seeds)]
+        for (start, stop), future in zip(blocks, futures):
+            future.result()
+            shared_means = np.ndarray(len(means), buffer=shm.buf)
+            means[start:stop] = shared_means[start:stop]
+            del shared_means
+            yield start, stop
+    finally:
+        # blocks that have not started yet are dropped when the consumer stops early
+        for future in futures:
+            future.cancel()
+        shm.close()
+        shm.unlink()
+
+
+def _fill_blocks(dist_vals, probs, sample_size, n_samples, seed, max_chunk_draws, n_workers, means):
+    blocks, use_counts, total_draws = _sample_blocks(len(dist_vals), sample_size, n_samples, max_chunk_draws)
+    seeds = sampling.block_seeds(seed, len(blocks))
+
+    if n_workers > 1 and len(blocks) > 1 and total_draws >= PARALLEL_MIN_DRAWS:
+        yield from _fill_blocks_parallel(dist_vals, probs, sample_size, use_counts, blocks, seeds, means, n_workers)
+        return
+    for (start, stop), block_seed in zip(blocks, seeds):
+        sampling.simulate_block(dist_vals, probs, sample_size, use_counts, block_seed, means[start:stop])
+        yield start, stop
+
+
+@instrument.timed
+def simulate_sample_means(dist_vals, probs, sample_size, n_samples, seed=None, max_chunk_draws=MAX_CHUNK_DRAWS,
+                          n_workers=N_WORKERS):
+    dist_vals = np.asarray(dist_vals, dtype=float)
+    probs = np.asarray(probs, dtype=float)
+    means = np.empty(n_samples)
+    for _ in _fill_blocks(dist_vals, probs, sample_size, n_samples, seed, max_chunk_draws, n_workers, means):
+        pass
+    return means
+
+
+def iter_sample_means(dist_vals, probs, sample_size, n_samples, seed=None, bin_size=0.1,
+                      max_chunk_draws=MAX_CHUNK_DRAWS, n_workers=N_WORKERS):
+    dist_vals = np.asarray(dist_vals, dtype=float)
+    probs = np.asarray(probs, dtype=float)
+    means = np.empty(n_samples)
+    bin_edges = np.arange(dist_vals.min() - bin_size / 2, dist_vals.max() + bin_size, bin_size)
+    hist = np.zeros(len(bin_edges) - 1, dtype=np.int64)
+    mean = m2 = 0.0
+    for start, stop in _fill_blocks(dist_vals, probs, sample_size, n_samples, seed, max_chunk_draws, n_workers,
+                                    means):
+        block = means[start:stop]
+        hist += np.histogram(block, bins=bin_edges)[0]
+        # merge the block moments into the running ones (Chan et al.)
+        block_mean = block.mean()
+        delta = block_mean - mean
+        mean += delta * len(block) / stop
+        m2 += np.sum((block - block_mean) ** 2) + delta ** 2 * start * len(block) / stop
+        yield SampleMeansProgress(means[:stop], mean, np.sqrt(m2 / stop), hist, bin_edges)
+
 
+def _sample_means_key(counts, sample_size, n_samples, seed):
+    # counts that are multiples of each other describe the same distribution
+    counts = counts // np.gcd.reduce(counts)
+    return (counts.tobytes(), sample_size, n_samples, seed), np.arange(1, len(counts) + 1), counts / counts.sum()
 
+
+def cached_sample_means(counts, sample_size, n_samples, seed):
+    key, dist_vals, probs = _sample_means_key(counts, sample_size, n_samples, seed)
+    means = SAMPLE_MEANS_CACHE.get_or_compute(
+        key, lambda: simulate_sample_means(dist_vals, probs, sample_size, n_samples, seed=seed)
+    )
+    logger.debug('Sample means cache: %s', SAMPLE_MEANS_CACHE.stats())
+    return means
+
+
+@instrument.timed
+def exact_sample_mean_pmf(dist_vals, probs, sample_size):
+    dist_vals = np.asarray(dist_vals)
+    if not np.all(np.mod(dist_vals, 1) == 0):
+        raise ValueError('The exact sampling distribution is only available for integer valued distributions.')
+    dist_vals = dist_vals.astype(int)
+    offset = dist_vals.min()
+    pmf = np.zeros(dist_vals.max() - offset + 1)
+    np.add.at(pmf, dist_vals - offset, probs)
+
+    # the sum of sample_size independent draws has the sample_size-fold self-convolution of
+    # the pmf as its distribution, which is a single pointwise power in the frequency domain
+    support_len = (len(pmf) - 1) * sample_size + 1
+    n_fft = next_fast_len(support_len, real=True)
+    sum_pmf = irfft(rfft(pmf, n_fft) ** sample_size, n_fft)[:support_len]
+    np.clip(sum_pmf, 0, None, out=sum_pmf)
+    sum_pmf /= sum_pmf.sum()
+    return (np.arange(support_len) + offset * sample_size) / sample_size, sum_pmf
+
+
+def _set_sample_means(means, sample_size):
+    st.session_state[SAMPLE_MEANS] = means
+    st.session_state[SAMPLE_MEANS_PMF] = None
+    st.session_state[STD_SAMPLE_MEANS] = (means - means.mean()) / means.std()
+    st.session_state[SAMPLE_SIZE] = sample_size
+
+
+@instrument.timed
 def generate_sample_means(sample_size, n_samples):
-    if len(st.session_state[VALUES]) == 0:
+    if st.session_state[N_VALUES] == 0:
+        st.error('You must create a distribution before generating sample means.')
+        return
+    _set_sample_means(cached_sample_means(st.session_state[COUNTS], sample_size, n_samples, st.session_state[SEED]),
+                      sample_size)
+
+
+def stream_sample_means(sample_size, n_samples):
+    if st.session_state[N_VALUES] == 0:
         st.error('You must create a distribution before generating sample means.')
         return
-    st.session_state[SAMPLE_MEANS] = np.array([np.random.choice(st.session_state[DIST_VALS],
-                                                                p=st.session_state[PROBS],
-                                                                size=sample_size).mean()
-                                               for _ in range(n_samples)])
-    st.session_state[STD_SAMPLE_MEANS] = \
-        (st.session_state[SAMPLE_MEANS] - st.session_state[SAMPLE_MEANS].mean()) / st.session_state[SAMPLE_MEANS].std()
+    seed = st.session_state[SEED]
+    key, dist_vals, probs = _sample_means_key(st.session_state[COUNTS], sample_size, n_samples, seed)
+    means = SAMPLE_MEANS_CACHE.get(key)
+    if means is None:
+        for progress in iter_sample_means(dist_vals, probs, sample_size, n_samples, seed=seed):
+            yield progress
+        # only a run that was not cancelled reaches the cache
+        means = SAMPLE_MEANS_CACHE.put(key, progress.means)
+    _set_sample_means(means, sample_size)
+
+
+@instrument.timed
+def generate_exact_sample_means(sample_size):
+    if st.session_state[N_VALUES] == 0:
+        st.error('You must create a distribution before generating sample means.')
+        return
+    means, pmf = exact_sample_mean_pmf(st.session_state[DIST_VALS], st.session_state[PROBS], sample_size)
+    st.session_state[SAMPLE_MEANS] = means
+    st.session_state[SAMPLE_MEANS_PMF] = pmf
     st.session_state[SAMPLE_SIZE] = sample_size
+    st.session_state[STD_SAMPLE_MEANS] = (means - get_sample_means_mean()) / get_sample_means_std()
 
 
 def get_distribution_mean():
-    return np.sum(st.session_state[DIST_VALS] * st.session_state[PROBS])
+    return st.session_state[VALUES_MEAN]
 
 
 def get_distribution_std():
-    return np.sqrt(
-        np.sum(st.session_state[DIST_VALS] ** 2 * st.session_state[PROBS])
-        - get_distribution_mean() ** 2
-    )
+    if st.session_state[N_VALUES] == 0:
+        return 0.0
+    return np.sqrt(st.session_state[VALUES_M2] / st.session_state[N_VALUES])
 
 
 def get_theoretical_sample_means_mean():
@@ -73,9 +295,18 @@ def get_theoretical_sample_means_std():
     return get_distribution_std() / np.sqrt(st.session_state[SAMPLE_SIZE])
 
 
+def get_sample_means_mean():
+    return np.average(st.session_state[SAMPLE_MEANS], weights=st.session_state[SAMPLE_MEANS_PMF])
+
+
+def get_sample_means_std():
+    return np.sqrt(np.average((st.session_state[SAMPLE_MEANS] - get_sample_means_mean()) ** 2,
+                              weights=st.session_state[SAMPLE_MEANS_PMF]))
+
+
 def plotly_bar_chart(n_dist_values, mean, std):
     return px.bar(
-        x=None if not (mean or std) else st.session_state[DIST_VALS],
+        x=st.session_state[DIST_VALS],
         y=st.session_state[PROBS],
         range_x=(0, n_dist_values + 1),
         labels={'x': 'k', 'y': 'P(x=k)'},
@@ -83,17 +314,55 @@ def plotly_bar_chart(n_dist_values, mean, std):
     )
 
 
-def plotly_distribution_chart(sample_means, group_label, title, bin_size=0.1):
-    fig = ff.create_distplot(
-        [sample_means],
-        group_labels=[group_label],
-        bin_size=bin_size,
-        show_rug=False
-    )
+@instrument.timed
+def plotly_distribution_chart(sample_means, group_label, title, bin_size=0.1, pmf=None):
+    if pmf is None and len(sample_means) > DISTPLOT_MAX_SAMPLES:
+        counts, edges = np.histogram(sample_means, bins=np.arange(sample_means.min(),
+                                                                  sample_means.max() + bin_size, bin_size))
+        fig = plotly_pmf_chart((edges[:-1] + edges[1:]) / 2, counts / counts.sum(), group_label, bin_size)
+    elif pmf is None:
+        fig = ff.create_distplot(
+            [sample_means],
+            group_labels=[group_label],
+            bin_size=bin_size,
+            show_rug=False
+        )
+    else:
+        fig = plotly_pmf_chart(sample_means, pmf, group_label, bin_size)
     fig.update_layout({'title': title})
     return fig
 
 
+def plotly_pmf_chart(values, pmf, group_label, bin_size):
+    # drop the far tails so the axis covers the same range a simulation would
+    spacing = values[1] - values[0] if len(values) > 1 else bin_size
+    visible = np.flatnonzero(pmf > pmf.max() * 1e-6)
+    values, pmf = values[visible[0]:visible[-1] + 1], pmf[visible[0]:visible[-1] + 1]
+    bins = np.arange(values[0], values[-1] + bin_size, bin_size)
+    density, edges = np.histogram(values, bins=bins, weights=pmf)
+    fig = go.Figure()
+    fig.add_bar(x=(edges[:-1] + edges[1:]) / 2, y=density / bin_size, width=bin_size,
+                name=group_label, opacity=0.7, legendgroup=group_label)
+    fig.add_scatter(x=values, y=pmf / spacing, mode='lines', name=group_label, showlegend=False,
+                    legendgroup=group_label)
+    return fig
+
+
+@instrument.timed
+def plotly_progress_charts(progress, sample_size, bin_size=0.1):
+    centers = (progress.bin_edges[:-1] + progress.bin_edges[1:]) / 2
+    pmf = progress.hist / len(progress.means)
+    description = f'{len(progress.means)} sample means using sample size {sample_size}.'
+    fig = plotly_distribution_chart(centers, 'Sample Means', f'Distribution of {description}', bin_size, pmf)
+    std_fig = plotly_distribution_chart((centers - progress.mean) / progress.std, 'Standardized Sample Means',
+                                        f'Standardized Distribution of {description}', bin_size, pmf)
+    return fig, std_fig
+
+
+def sample_means_pmf():
+    return st.session_state[SAMPLE_MEANS_PMF]
+
+
 def sample_means():
     return st.session_state[SAMPLE_MEANS]
 
@@ -1,9 +1,165 @@
 import numpy as np
+import pandas as pd
 
+from backend import instrument
 
+
+@instrument.timed
 def covariance(x, y):
     return np.sum((x - x.mean()) * (y - y.mean())) / (len(x) - 1)
 
 
+@instrument.timed
 def correlation(x, y):
-    return covariance(x, y) / (x.std() * y.std())
+    return covariance(x, y) / (x.std(ddof=1) * y.std(ddof=1))
+
+
+# Running means and co-moments of a stream of rows, updated chunk by chunk with the pairwise
+# formulas of Chan, Golub and LeVeque so partial results from different workers can be merged.
+class CovarianceAccumulator:
+
+    def __init__(self, n_columns=2):
+        self.n = 0
+        self.mean = np.zeros(n_columns)
+        self.comoments = np.zeros((n_columns, n_columns))
+
+    def update(self, *columns):
+        chunk = np.column_stack(columns) if len(columns) > 1 else np.asarray(columns[0], dtype=float)
+        if chunk.ndim == 1:
+            chunk = chunk.reshape(-1, 1)
+        if len(chunk) == 0:
+            return self
+        mean = chunk.mean(axis=0)
+        centered = chunk - mean
+        return self._combine(len(chunk), mean, centered.T @ centered)
+
+    def merge(self, other):
+        return self._combine(other.n, other.mean, other.comoments)
+
+    def _combine(self, n, mean, comoments):
+        if n == 0:
+            return self
+        total = self.n + n
+        delta = mean - self.mean
+        self.comoments = self.comoments + comoments + np.outer(delta, delta) * (self.n * n / total)
+        self.mean = self.mean + delta * (n / total)
+        self.n = total
+        return self
+
+    def covariance(self, ddof=1):
+        return self.comoments / (self.n - ddof)
+
+    def std(self, ddof=1):
+        return np.sqrt(np.diag(self.comoments) / (self.n - ddof))
+
+    def correlation(self):
+        std = np.sqrt(np.diag(self.comoments))
+        return self.comoments / np.outer(std, std)
+
+
+def _as_matrix(data, dtype):
+    if isinstance(data, pd.DataFrame):
+        data = data.select_dtypes('number')
+        return data.to_numpy(dtype=dtype), data.columns
+    return np.asarray(data, dtype=dtype), None
+
+
+def _gram(a, b, block_size=None, symmetric=False):
+    # a.T @ b, optionally one block of columns at a time to bound the working set on wide tables
+    if block_size is None or a.shape[1] <= block_size:
+        return a.T @ b
+    out = np.empty((a.shape[1], b.shape[1]), dtype=np.result_type(a, b))
+    for i in range(0, a.shape[1], block_size):
+        for j in range(i if symmetric else 0, b.shape[1], block_size):
+            out[i:i + block_size, j:j + block_size] = a[:, i:i + block_size].T @ b[:, j:j + block_size]
+            if symmetric and j != i:
+                out[j:j + block_size, i:i + block_size] = out[i:i + block_size, j:j + block_size].T
+    return out
+
+
+def _pairwise_moments(X, block_size):
+    # centred cross products over pairwise complete rows, each as a single matrix product
+    mask = ~np.isnan(X)
+    if mask.all():
+        X = X - X.mean(axis=0)
+        n = np.full((X.shape[1], X.shape[1]), len(X), dtype=X.dtype)
+        products = _gram(X, X, block_size, symmetric=True)
+        squares = np.diag(products)
+        return n, products, np.broadcast_to(squares[:, None], n.shape), np.broadcast_to(squares, n.shape)
+    X = np.where(mask, X - np.nanmean(X, axis=0), 0)
+    mask = mask.astype(X.dtype)
+    n = _gram(mask, mask, block_size, symmetric=True)
+    sums = _gram(X, mask, block_size)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        products = _gram(X, X, block_size, symmetric=True) - sums * sums.T / n
+        squares = _gram(X * X, mask, block_size) - sums * sums / n
+    return n, products, squares, squares.T
+
+
+def _labelled(matrix, columns):
+    return matrix if columns is None else pd.DataFrame(matrix, index=columns, columns=columns)
+
+
+@instrument.timed
+def covariance_matrix(data, ddof=1, dtype=np.float64, block_size=None):
+    X, columns = _as_matrix(data, dtype)
+    n, products, _, _ = _pairwise_moments(X, block_size)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return _labelled(products / (n - ddof), columns)
+
+
+@instrument.timed
+def correlation_matrix(data, dtype=np.float64, block_size=None):
+    X, columns = _as_matrix(data, dtype)
+    _, products, squares, squares_t = _pairwise_moments(X, block_size)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return _labelled(products / np.sqrt(squares * squares_t), columns)
+
+
+def grouped_moments(data, codes, n_groups=None):
+    # per group row counts, sums and cross products of every column pair. The rows are sorted by group once
+    # and each group's contiguous block gives its cross products in a single matrix product.
+    X = np.asarray(data, dtype=float)
+    codes = np.asarray(codes)
+    if n_groups is None:
+        n_groups = int(codes.max()) + 1 if len(codes) else 0
+    order = np.argsort(codes, kind='stable')
+    X, codes = X[order], codes[order]
+    # shifting by the overall mean keeps the sums small and the later subtraction accurate
+    X -= X.mean(axis=0)
+    counts = np.bincount(codes, minlength=n_groups)
+    sums = np.zeros((n_groups, X.shape[1]))
+    products = np.zeros((n_groups, X.shape[1], X.shape[1]))
+    stops = np.cumsum(counts)
+    for group in np.flatnonzero(counts):
+        block = X[stops[group] - counts[group]:stops[group]]
+        sums[group] = block.sum(axis=0)
+        products[group] = block.T @ block
+    return counts.astype(float), sums, products
+
+
+def grouped_covariance_matrices(data, codes, n_groups=None, ddof=1):
+    counts, sums, products = grouped_moments(data, codes, n_groups)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = sums / counts[:, None]
+        comoments = products - counts[:, None, None] * means[:, :, None] * means[:, None, :]
+        return comoments / (counts - ddof)[:, None, None]
+
+
+def grouped_correlation_matrices(data, codes, n_groups=None):
+    covariances = grouped_covariance_matrices(data, codes, n_groups)
+    std = np.sqrt(np.diagonal(covariances, axis1=1, axis2=2))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return covariances / (std[:, :, None] * std[:, None, :])
+
+
+@instrument.timed
+def grouped_correlation(df, by):
+    # {group: correlation matrix of the numeric columns} for every group of df
+    codes, groups = pd.factorize(df[by], sort=True)
+    numeric = df.select_dtypes('number')
+    # rows with a missing key have code -1 and are left out, like groupby does by default
+    keep = codes >= 0
+    matrices = grouped_correlation_matrices(numeric.to_numpy(dtype=float)[keep], codes[keep], len(groups))
+    return {group: pd.DataFrame(matrix, index=numeric.columns, columns=numeric.columns)
+            for group, matrix in zip(groups, matrices)}
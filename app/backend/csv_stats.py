@@ -0,0 +1,112 @@
+import io
+import logging
+import multiprocessing as mp
+import os
+import sys
+import time
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backend.cov import CovarianceAccumulator
+
+CHUNK_BYTES = 16 * 2 ** 20
+N_WORKERS = int(os.environ.get('CSV_STATS_WORKERS', os.cpu_count() or 1))
+
+CsvMoments = namedtuple('CsvMoments', ['summary', 'covariance', 'correlation', 'rows', 'seconds'])
+
+logger = logging.getLogger(__name__)
+
+
+def _open_csv(path):
+    if zipfile.is_zipfile(path):
+        archive = zipfile.ZipFile(path)
+        name = next(name for name in archive.namelist() if name.endswith('.csv'))
+        return archive.open(name)
+    return open(path, 'rb')
+
+
+def _read_chunks(stream, chunk_bytes):
+    # raw blocks of whole lines, parsing is left to the workers
+    remainder = b''
+    while block := stream.read(chunk_bytes):
+        block = remainder + block
+        end = block.rfind(b'\n') + 1
+        remainder = block[end:]
+        if end:
+            yield block[:end]
+    if remainder.strip():
+        yield remainder
+
+
+def _chunk_moments(header, chunk, columns):
+    values = pd.read_csv(io.BytesIO(header + chunk), usecols=columns)[columns].dropna().to_numpy(dtype=float)
+    moments = CovarianceAccumulator(len(columns)).update(values)
+    if len(values) == 0:
+        return moments, np.full(len(columns), np.inf), np.full(len(columns), -np.inf)
+    return moments, values.min(axis=0), values.max(axis=0)
+
+
+def csv_moments(path, columns=None, chunk_bytes=CHUNK_BYTES, n_workers=N_WORKERS, progress=None):
+    # Covariance, correlation and summary statistics of a (zipped) csv with bounded memory: the file is
+    # streamed in chunk_bytes blocks, at most two blocks per worker are in flight at any time.
+    start = time.perf_counter()
+    with _open_csv(path) as stream:
+        header = stream.readline()
+        chunks = _read_chunks(stream, chunk_bytes)
+        first = next(chunks, b'')
+        if columns is None:
+            columns = pd.read_csv(io.BytesIO(header + first), nrows=1000).select_dtypes('number').columns.tolist()
+        columns = list(columns)
+
+        moments = CovarianceAccumulator(len(columns))
+        minimum = np.full(len(columns), np.inf)
+        maximum = np.full(len(columns), -np.inf)
+        n_bytes = 0
+
+        def reduce(result, chunk_size):
+            nonlocal minimum, maximum, n_bytes
+            chunk_moments, chunk_min, chunk_max = result
+            moments.merge(chunk_moments)
+            minimum, maximum = np.minimum(minimum, chunk_min), np.maximum(maximum, chunk_max)
+            n_bytes += chunk_size
+            if progress is not None:
+                elapsed = time.perf_counter() - start
+                progress(moments.n, n_bytes, moments.n / elapsed if elapsed else 0.0)
+
+        all_chunks = (chunk for chunks in ([first], chunks) for chunk in chunks if chunk)
+        if n_workers <= 1:
+            for chunk in all_chunks:
+                reduce(_chunk_moments(header, chunk, columns), len(chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers, mp_context=mp.get_context('spawn')) as executor:
+                in_flight = []
+                for chunk in all_chunks:
+                    in_flight.append((executor.submit(_chunk_moments, header, chunk, columns), len(chunk)))
+                    if len(in_flight) >= 2 * n_workers:
+                        future, chunk_size = in_flight.pop(0)
+                        reduce(future.result(), chunk_size)
+                for future, chunk_size in in_flight:
+                    reduce(future.result(), chunk_size)
+
+    seconds = time.perf_counter() - start
+    logger.info('Read %d rows of %s in %.2fs (%.0f rows/s)', moments.n, path, seconds, moments.n / seconds)
+    summary = pd.DataFrame([np.full(len(columns), moments.n), moments.mean, moments.std(), minimum, maximum],
+                           index=['count', 'mean', 'std', 'min', 'max'], columns=columns)
+    return CsvMoments(summary,
+                      pd.DataFrame(moments.covariance(), index=columns, columns=columns),
+                      pd.DataFrame(moments.correlation(), index=columns, columns=columns),
+                      moments.n, seconds)
+
+
+def _print_progress(rows, n_bytes, rows_per_second):
+    print(f'\r{rows:,} rows, {n_bytes / 2 ** 20:,.0f} MiB, {rows_per_second:,.0f} rows/s', end='', flush=True)
+
+
+if __name__ == '__main__':
+    for csv_path in sys.argv[1:]:
+        result = csv_moments(csv_path, progress=_print_progress)
+        print(f'\n{csv_path}\n{result.summary}\n\n{result.correlation}\n')
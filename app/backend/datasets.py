@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from os import path
+
+import numpy as np
+import pandas as pd
+
+APP_PATH = path.dirname(path.dirname(__file__))
+DATA_PATH = os.environ.get('DATA_PATH', path.join(path.dirname(APP_PATH), 'data'))
+CACHE_PATH = os.environ.get('DATASETS_CACHE_PATH', path.join(APP_PATH, '.cache', 'datasets'))
+FORMAT_VERSION = 1
+
+# name -> source file under DATA_PATH and an optional clean up step applied once before conversion
+DATASETS = {
+    'penguins': dict(file='penguins.csv', prepare=lambda df: df.dropna().reset_index(drop=True)),
+    'apples': dict(file='apples.csv'),
+    'mtcars': dict(file='mtcars.csv'),
+    'salaries_extended': dict(file='salaries_extended.csv'),
+    'salaries_popvar_unknown': dict(file='salaries_popvar_unknown.csv'),
+    'mean_diff_dependent': dict(file='mean_diff_dependent.csv'),
+}
+
+_loaded = {}
+_lock = threading.Lock()
+
+
+def source_path(name):
+    return path.join(DATA_PATH, DATASETS[name]['file'])
+
+
+def checksum(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        while block := f.read(2 ** 20):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_columns(df, directory, meta=None):
+    # one .npy per column, text columns are stored as categorical codes with their categories in meta.json
+    tmp = tempfile.mkdtemp(dir=path.dirname(directory))
+    columns = []
+    for i, (column, values) in enumerate(df.items()):
+        if isinstance(values.dtype, pd.CategoricalDtype) or values.dtype == object:
+            categorical = pd.Categorical(values)
+            np.save(path.join(tmp, f'{i}.npy'), categorical.codes)
+            columns.append(dict(name=column, categories=categorical.categories.tolist()))
+        else:
+            np.save(path.join(tmp, f'{i}.npy'), values.to_numpy())
+            columns.append(dict(name=column))
+    with open(path.join(tmp, 'meta.json'), 'w') as f:
+        json.dump(dict(meta or {}, version=FORMAT_VERSION, rows=len(df), columns=columns), f)
+    try:
+        os.rename(tmp, directory)
+    except OSError:
+        # another process converted the same source first
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def read_columns(directory):
+    with open(path.join(directory, 'meta.json')) as f:
+        meta = json.load(f)
+    data = {}
+    for i, column in enumerate(meta['columns']):
+        values = np.load(path.join(directory, f'{i}.npy'), mmap_mode='r')
+        if 'categories' in column:
+            values = pd.Categorical.from_codes(values, column['categories'])
+        data[column['name']] = values
+    # copy=False keeps the memory-mapped, read-only arrays as the columns' storage
+    return pd.DataFrame(data, copy=False)
+
+
+def convert(name):
+    source = source_path(name)
+    directory = path.join(CACHE_PATH, name, f'v{FORMAT_VERSION}-{checksum(source)[:16]}')
+    if not path.exists(path.join(directory, 'meta.json')):
+        os.makedirs(path.dirname(directory), exist_ok=True)
+        df = pd.read_csv(source)
+        prepare = DATASETS[name].get('prepare')
+        write_columns(prepare(df) if prepare else df, directory, dict(source=DATASETS[name]['file']))
+    return directory
+
+
+def load(name):
+    # the same read-only DataFrame for every caller in the process
+    with _lock:
+        if name not in _loaded:
+            _loaded[name] = read_columns(convert(name))
+        return _loaded[name]
+
+
+if __name__ == '__main__':
+    for dataset in DATASETS:
+        print(f'{dataset}: {convert(dataset)}')
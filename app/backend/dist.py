@@ -1,9 +1,72 @@
+import io
+import os
+import threading
+
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from scipy.stats import binom, hypergeom, geom, nbinom, poisson
+from scipy.stats import binom, hypergeom, geom, nbinom, poisson, randint
+
+from backend import instrument, pmf_tables
+from backend.cache import LRUCache
 
 PROPS = dict(boxstyle='round', facecolor='wheat', alpha=0.5)
+RENDER_DPI = 200
+# plots cover the central 1 - SUPPORT_EPS of the mass and merge neighbouring values past MAX_BARS bars
+SUPPORT_EPS = 1e-6
+MAX_BARS = 70
+
+# rendered plots shared across every session of this process
+RENDER_CACHE = LRUCache(max_bytes=int(os.environ.get('DIST_RENDER_CACHE_BYTES', 64 * 2 ** 20)),
+                        name='dist.renders')
+# pyplot keeps global state, so only one session may draw at a time
+_render_lock = threading.Lock()
+
+
+@instrument.timed
+def render(dist, *params, fmt='png'):
+    return RENDER_CACHE.get_or_compute((dist.__name__, params, fmt), lambda: _render(dist, params, fmt))
+
+
+@instrument.timed
+def _render(dist, params, fmt):
+    with _render_lock:
+        fig = dist.plot_dist(*params)
+        try:
+            image = io.BytesIO()
+            fig.savefig(image, format=fmt, bbox_inches='tight', dpi=RENDER_DPI)
+            return image.getvalue()
+        finally:
+            plt.close(fig)
+
+
+def _into(out, values):
+    if out is None:
+        return values
+    np.copyto(out, values)
+    return out
+
+
+def _pmf(dist, k, params, compute):
+    # slider positions are served from the precomputed tables, anything else falls back to scipy
+    pmf = pmf_tables.lookup(dist.__name__, k, *params)
+    return compute() if pmf is None else pmf
+
+
+def support(dist, *params, eps=SUPPORT_EPS):
+    lower, upper = dist.bounds(*params)
+    lo, hi = dist.ppf(eps / 2, *params), dist.ppf(1 - eps / 2, *params)
+    if not (np.isfinite(lo) and np.isfinite(hi)):
+        return np.arange(0)
+    lo = max(lo, lower)
+    return np.arange(lo, max(min(hi, upper), lo) + 1, dtype=int)
+
+
+def _bars(k, pmf, max_bars=MAX_BARS):
+    if len(k) <= max_bars:
+        return k, pmf
+    starts = np.arange(0, len(k), -(-len(k) // max_bars))
+    return k[starts], np.add.reduceat(pmf, starts)
 
 
 class Uniform:
@@ -25,20 +88,40 @@ class Uniform:
         return fig
 
     @staticmethod
-    def expectation(a, b):
-        return (a + b) / 2
+    def expectation(a, b, out=None):
+        out = np.add(a, b, out=out, dtype=float)
+        out /= 2
+        return out
+
+    @staticmethod
+    def variance(a, b, out=None):
+        out = np.subtract(b, a, out=out, dtype=float)
+        out += 1
+        out **= 2
+        out -= 1
+        out /= 12
+        return out
+
+    @staticmethod
+    def pmf(k, a, b, out=None):
+        return _into(out, randint.pmf(k, a, np.add(b, 1)))
+
+    @staticmethod
+    def cdf(k, a, b, out=None):
+        return _into(out, randint.cdf(k, a, np.add(b, 1)))
 
     @staticmethod
-    def variance(a, b):
-        return ((b - a + 1) ** 2 - 1) / 12
+    def ppf(q, a, b, out=None):
+        return _into(out, randint.ppf(q, a, np.add(b, 1)))
 
 
 class Binomial:
 
     @classmethod
     def plot_dist(cls, n, p):
-        k = np.arange(0, n+1)
-        pmf = binom(n, p).pmf(k)
+        k = support(cls, n, p)
+        pmf = _pmf(cls, k, (n, p), lambda: np.exp(cls.logpmf(k, n, p)))
+        k, pmf = _bars(k, pmf)
         fig = plt.figure(figsize=(5, 2))
         sns.barplot(x=k, y=pmf, color='cadetblue')
         text = f'E(X) = {cls.expectation(n, p):.2f}\nV(X) = {cls.variance(n, p)}'
@@ -52,20 +135,43 @@ class Binomial:
         return fig
 
     @staticmethod
-    def expectation(n, p):
-        return n * p
+    def expectation(n, p, out=None):
+        return np.multiply(n, p, out=out, dtype=float)
+
+    @staticmethod
+    def variance(n, p, out=None):
+        out = np.multiply(n, p, out=out, dtype=float)
+        out *= np.subtract(1, p)
+        return out
+
+    @staticmethod
+    def bounds(n, p):
+        return 0, n
+
+    @staticmethod
+    def logpmf(k, n, p, out=None):
+        return _into(out, binom.logpmf(k, n, p))
 
     @staticmethod
-    def variance(n, p):
-        return n * p * (1 - p)
+    def pmf(k, n, p, out=None):
+        return _into(out, binom.pmf(k, n, p))
+
+    @staticmethod
+    def cdf(k, n, p, out=None):
+        return _into(out, binom.cdf(k, n, p))
+
+    @staticmethod
+    def ppf(q, n, p, out=None):
+        return _into(out, binom.ppf(q, n, p))
 
 
 class Hypergeometric:
 
     @classmethod
     def plot_dist(cls, M, n, N):
-        k = np.arange(max(0, N - M + n), min(n, N) + 1)
-        pmf = hypergeom(M, n, N).pmf(k)
+        k = support(cls, M, n, N)
+        pmf = _pmf(cls, k, (M, n, N), lambda: np.exp(cls.logpmf(k, M, n, N)))
+        k, pmf = _bars(k, pmf)
         fig = plt.figure(figsize=(5, 2))
         sns.barplot(x=k, y=pmf, color='cadetblue')
         text = f'E(X) = {cls.expectation(M, n, N):.2f}\nV(X) = {cls.variance(M, n, N)}'
@@ -79,20 +185,45 @@ class Hypergeometric:
         return fig
 
     @staticmethod
-    def expectation(M, n, N):
-        return N * n / M
+    def expectation(M, n, N, out=None):
+        return np.multiply(N, np.divide(n, M), out=out)
 
     @staticmethod
-    def variance(M, n, N):
-        return (M - N) / (M - 1) * N * n / M * (1 - n / M)
+    def variance(M, n, N, out=None):
+        out = np.multiply(N, np.divide(n, M), out=out)
+        out *= np.subtract(1, np.divide(n, M))
+        out *= np.subtract(M, N)
+        out /= np.subtract(M, 1)
+        return out
+
+    @staticmethod
+    def bounds(M, n, N):
+        return max(0, N - M + n), min(n, N)
+
+    @staticmethod
+    def logpmf(k, M, n, N, out=None):
+        return _into(out, hypergeom.logpmf(k, M, n, N))
+
+    @staticmethod
+    def pmf(k, M, n, N, out=None):
+        return _into(out, hypergeom.pmf(k, M, n, N))
+
+    @staticmethod
+    def cdf(k, M, n, N, out=None):
+        return _into(out, hypergeom.cdf(k, M, n, N))
+
+    @staticmethod
+    def ppf(q, M, n, N, out=None):
+        return _into(out, hypergeom.ppf(q, M, n, N))
 
 
 class Geometric:
 
     @classmethod
     def plot_dist(cls, p):
-        k = np.arange(1, 30)
-        pmf = geom(p).pmf(k)
+        k = support(cls, p)
+        pmf = _pmf(cls, k, (p,), lambda: np.exp(cls.logpmf(k, p)))
+        k, pmf = _bars(k, pmf)
         fig = plt.figure(figsize=(5, 2))
         sns.barplot(x=k, y=pmf, color='cadetblue')
         text = f'E(X) = {cls.expectation(p):.2f}\nV(X) = {cls.variance(p)}'
@@ -106,20 +237,43 @@ class Geometric:
         return fig
 
     @staticmethod
-    def expectation(p):
-        return 1 / p
+    def expectation(p, out=None):
+        return np.divide(1, p, out=out, dtype=float)
+
+    @staticmethod
+    def variance(p, out=None):
+        out = np.subtract(1, p, out=out, dtype=float)
+        out /= np.square(p)
+        return out
+
+    @staticmethod
+    def bounds(p):
+        return 1, np.inf
 
     @staticmethod
-    def variance(p):
-        return (1 - p) / p**2
+    def logpmf(k, p, out=None):
+        return _into(out, geom.logpmf(k, p))
+
+    @staticmethod
+    def pmf(k, p, out=None):
+        return _into(out, geom.pmf(k, p))
+
+    @staticmethod
+    def cdf(k, p, out=None):
+        return _into(out, geom.cdf(k, p))
+
+    @staticmethod
+    def ppf(q, p, out=None):
+        return _into(out, geom.ppf(q, p))
 
 
 class NegativeBinomial:
 
     @classmethod
     def plot_dist(cls, n, p):
-        k = np.arange(n, n + 70)
-        pmf = nbinom(n, p, loc=n).pmf(k)
+        k = support(cls, n, p)
+        pmf = _pmf(cls, k, (n, p), lambda: np.exp(cls.logpmf(k, n, p)))
+        k, pmf = _bars(k, pmf)
         fig = plt.figure(figsize=(5, 2))
         sns.barplot(x=k, y=pmf, color='cadetblue')
         text = f'E(X) = {cls.expectation(n, p):.2f}\nV(X) = {cls.variance(n, p)}'
@@ -133,20 +287,43 @@ class NegativeBinomial:
         return fig
 
     @staticmethod
-    def expectation(n, p):
-        return n / p
+    def expectation(n, p, out=None):
+        return np.divide(n, p, out=out, dtype=float)
+
+    @staticmethod
+    def variance(n, p, out=None):
+        out = np.divide(n, np.square(p), out=out, dtype=float)
+        out *= np.subtract(1, p)
+        return out
 
     @staticmethod
-    def variance(n, p):
-        return n * (1 - p) / p**2
+    def bounds(n, p):
+        return n, np.inf
+
+    @staticmethod
+    def logpmf(k, n, p, out=None):
+        return _into(out, nbinom.logpmf(k, n, p, loc=n))
+
+    @staticmethod
+    def pmf(k, n, p, out=None):
+        return _into(out, nbinom.pmf(k, n, p, loc=n))
+
+    @staticmethod
+    def cdf(k, n, p, out=None):
+        return _into(out, nbinom.cdf(k, n, p, loc=n))
+
+    @staticmethod
+    def ppf(q, n, p, out=None):
+        return _into(out, nbinom.ppf(q, n, p, loc=n))
 
 
 class Poisson:
 
     @classmethod
     def plot_dist(cls, rate):
-        k = np.arange(0, rate + 21, dtype=int)
-        pmf = poisson(rate).pmf(k)
+        k = support(cls, rate)
+        pmf = _pmf(cls, k, (rate,), lambda: np.exp(cls.logpmf(k, rate)))
+        k, pmf = _bars(k, pmf)
         fig = plt.figure(figsize=(5, 2))
         sns.barplot(x=k, y=pmf, color='cadetblue')
         text = f'E(X) = {cls.expectation(rate):.2f}\nV(X) = {cls.variance(rate)}'
@@ -160,9 +337,29 @@ class Poisson:
         return fig
 
     @staticmethod
-    def expectation(rate):
-        return rate
+    def expectation(rate, out=None):
+        return np.positive(rate, out=out, dtype=float)
+
+    @staticmethod
+    def variance(rate, out=None):
+        return np.positive(rate, out=out, dtype=float)
+
+    @staticmethod
+    def bounds(rate):
+        return 0, np.inf
+
+    @staticmethod
+    def logpmf(k, rate, out=None):
+        return _into(out, poisson.logpmf(k, rate))
+
+    @staticmethod
+    def pmf(k, rate, out=None):
+        return _into(out, poisson.pmf(k, rate))
+
+    @staticmethod
+    def cdf(k, rate, out=None):
+        return _into(out, poisson.cdf(k, rate))
 
     @staticmethod
-    def variance(rate):
-        return rate
+    def ppf(q, rate, out=None):
+        return _into(out, poisson.ppf(q, rate))
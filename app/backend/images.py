@@ -0,0 +1,85 @@
+import hashlib
+import json
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from os import path
+
+from backend import datasets
+
+IMAGES_PATH = os.environ.get('IMAGES_PATH', path.join(datasets.APP_PATH, 'images'))
+MANIFEST = '.manifest.json'
+# bump to re-render every image after changing how they are drawn
+RENDER_VERSION = 1
+
+# datasets rendered at build time and the column their per group images are split on
+FIGURES = {
+    'penguins': dict(group_by='species'),
+}
+
+
+def jobs():
+    # (output file, dataset, kind, hue, group) for every image the pages read
+    for name, spec in FIGURES.items():
+        group_by = spec.get('group_by')
+        yield f'{name}-pairplot.png', name, 'pairplot', None, None
+        yield f'{name}-heatmap.png', name, 'heatmap', None, None
+        if group_by is None:
+            continue
+        yield f'{name}-pairplot-{group_by}.png', name, 'pairplot', group_by, None
+        for group in datasets.load(name)[group_by].unique():
+            yield f'{group}-pairplot.png', name, 'pairplot', None, (group_by, group)
+            yield f'{group}-heatmap.png', name, 'heatmap', None, (group_by, group)
+
+
+def content_hash(dataset_checksum, job):
+    return hashlib.sha256(json.dumps([RENDER_VERSION, dataset_checksum, job[1:]], default=str).encode()).hexdigest()
+
+
+def render(job, images_path):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from backend import cov
+
+    output, name, kind, hue, group = job
+    df = datasets.load(name)
+    if group is not None:
+        df = df[df[group[0]] == group[1]]
+    sns.set_theme()
+    if kind == 'pairplot':
+        fig = sns.pairplot(df, hue=hue).figure
+    else:
+        fig = plt.figure()
+        sns.heatmap(cov.correlation_matrix(df), vmin=-1, vmax=1, cmap='ocean', annot=True, linewidths=1,
+                    linecolor='k')
+    fig.savefig(path.join(images_path, output), bbox_inches='tight')
+    plt.close(fig)
+    return output
+
+
+def build(images_path=IMAGES_PATH, n_workers=os.cpu_count() or 1):
+    manifest_path = path.join(images_path, MANIFEST)
+    manifest = {}
+    if path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    checksums = {name: datasets.checksum(datasets.source_path(name)) for name in FIGURES}
+    hashes = {job[0]: content_hash(checksums[job[1]], job) for job in jobs()}
+    stale = [job for job in jobs()
+             if manifest.get(job[0]) != hashes[job[0]] or not path.exists(path.join(images_path, job[0]))]
+    print(f'{len(hashes) - len(stale)} images up to date, rendering {len(stale)}')
+
+    with ProcessPoolExecutor(max_workers=n_workers, mp_context=mp.get_context('spawn')) as executor:
+        for output in executor.map(render, stale, [images_path] * len(stale)):
+            manifest[output] = hashes[output]
+            print(f'rendered {output}')
+
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    build()
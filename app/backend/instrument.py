@@ -0,0 +1,145 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+import numpy as np
+
+from backend import cache
+
+# Instrumentation is opt-in: with INSTRUMENT unset, timed() hands back the undecorated function and span()
+# a shared no-op context manager, so the instrumented code runs exactly as before.
+ENABLED = os.environ.get('INSTRUMENT', '').lower() in ('1', 'true', 'yes', 'on')
+# latencies kept per metric for the percentiles, the most recent ones
+SAMPLES = 2048
+PERCENTILES = (50, 95, 99)
+
+logger = logging.getLogger(__name__)
+if ENABLED and not logger.handlers:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(os.environ.get('INSTRUMENT_LOG_LEVEL', 'INFO').upper())
+
+_metrics = {}
+_lock = threading.Lock()
+_disabled = nullcontext()
+
+
+class _Metric:
+
+    __slots__ = ('count', 'total', 'samples')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=SAMPLES)
+
+
+def record(name, seconds):
+    with _lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = _Metric()
+        metric.count += 1
+        metric.total += seconds
+        metric.samples.append(seconds)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(json.dumps(dict(event='call', name=name, ms=round(seconds * 1000, 3))))
+
+
+class _Span:
+
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def span(name):
+    # with span('clt.histogram'): ... times the block under the given name
+    return _Span(name) if ENABLED else _disabled
+
+
+def _metric_name(fn):
+    return f'{fn.__module__.removeprefix("backend.")}.{fn.__qualname__}'
+
+
+def timed(fn=None, name=None):
+    # @timed or @timed(name='...') records the latency of every call of the function
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        metric_name = name or _metric_name(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(metric_name, time.perf_counter() - start)
+        return wrapper
+    return decorate if fn is None else decorate(fn)
+
+
+def latencies():
+    # one row per metric: calls, total and mean time and the latency percentiles, in milliseconds
+    with _lock:
+        metrics = [(name, metric.count, metric.total, np.array(metric.samples)) for name, metric in _metrics.items()]
+    rows = []
+    for name, count, total, samples in sorted(metrics, key=lambda metric: -metric[2]):
+        row = dict(name=name, calls=count, total_ms=total * 1000, mean_ms=total / count * 1000)
+        for percentile, value in zip(PERCENTILES, np.percentile(samples, PERCENTILES) * 1000):
+            row[f'p{percentile}_ms'] = value
+        rows.append(row)
+    return rows
+
+
+def cache_stats():
+    return [dict(name=name, **lru.stats()) for name, lru in sorted(cache.caches().items())]
+
+
+def log_summary():
+    # the current latencies and cache statistics as one json line each
+    for row in latencies():
+        logger.info(json.dumps(dict(event='latency', **{k: round(v, 3) if isinstance(v, float) else v
+                                                        for k, v in row.items()})))
+    for row in cache_stats():
+        logger.info(json.dumps(dict(event='cache', **row)))
+
+
+def reset():
+    with _lock:
+        _metrics.clear()
+
+
+def debug_panel():
+    # the latencies and cache hit rates in the sidebar, only when instrumentation is on
+    if not ENABLED:
+        return
+    import pandas as pd
+    import streamlit as st
+
+    with st.sidebar.expander('⏱️ Timings'):
+        rows = latencies()
+        if rows:
+            st.dataframe(pd.DataFrame(rows).set_index('name').round(2))
+        else:
+            st.caption('No calls recorded yet.')
+        st.dataframe(pd.DataFrame(cache_stats(), columns=['name', 'hits', 'misses', 'hit_rate', 'entries', 'bytes',
+                                                          'max_bytes']).set_index('name'))
+        st.button('Reset', on_click=reset, key='instrument_reset')
+    log_summary()
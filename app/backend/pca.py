@@ -0,0 +1,109 @@
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from backend import cov, datasets, instrument
+from backend.cache import LRUCache
+from backend.cov import CovarianceAccumulator
+
+# up to this many columns the full p x p matrix is decomposed, wider data with a few components asked for
+# goes through the randomized svd of the data instead
+EIGH_MAX_COLUMNS = 500
+OVERSAMPLES = 10
+POWER_ITERATIONS = 4
+
+# components: (k, p) rows of unit loadings, mean and scale: what each column is centred and divided by,
+# explained_variance_ratio: out of the total variance of all p (scaled) columns
+PCAFit = namedtuple('PCAFit', ['components', 'explained_variance', 'explained_variance_ratio', 'mean', 'scale',
+                               'columns', 'n'])
+
+# fits of the bundled datasets shared across every session of this process
+FITS_CACHE = LRUCache(max_bytes=int(os.environ.get('PCA_CACHE_BYTES', 32 * 2 ** 20)),
+                      name='pca.fits')
+
+
+def _numeric(data):
+    if isinstance(data, pd.DataFrame):
+        data = data.select_dtypes('number')
+        return data.to_numpy(dtype=float), data.columns.tolist()
+    data = np.asarray(data, dtype=float)
+    return data, list(range(data.shape[1]))
+
+
+def _orient(components):
+    # eigenvectors are only defined up to sign, the largest loading of each component is made positive
+    signs = np.sign(components[np.arange(len(components)), np.abs(components).argmax(axis=1)])
+    return components * np.where(signs == 0, 1, signs)[:, None]
+
+
+def _result(components, variances, total_variance, mean, scale, columns, n):
+    return PCAFit(_orient(components), variances, variances / total_variance, mean, scale, columns, n)
+
+
+def _fit_covariance(matrix, k, mean, scale, columns, n):
+    # the symmetric eigendecomposition returns ascending eigenvalues, the largest k are the last ones
+    values, vectors = np.linalg.eigh(matrix)
+    k = len(values) if k is None else k
+    return _result(vectors[:, ::-1][:, :k].T, values[::-1][:k], values.sum(), mean, scale, columns, n)
+
+
+def _randomized_components(X, k, oversamples, power_iterations, seed):
+    # Halko, Martinsson and Tropp: the range of X is captured by X times a few random directions, sharpened
+    # with power iterations that are re-orthonormalized to keep the small singular values from vanishing
+    rng = np.random.default_rng(seed)
+    Q, _ = np.linalg.qr(X @ rng.standard_normal((X.shape[1], min(k + oversamples, X.shape[1]))))
+    for _ in range(power_iterations):
+        Q, _ = np.linalg.qr(X.T @ Q)
+        Q, _ = np.linalg.qr(X @ Q)
+    _, singular_values, vt = np.linalg.svd(Q.T @ X, full_matrices=False)
+    return vt[:k], singular_values[:k]
+
+
+@instrument.timed
+def fit(data, k=None, standardize=True, method='auto', seed=None, oversamples=OVERSAMPLES,
+        power_iterations=POWER_ITERATIONS):
+    X, columns = _numeric(data)
+    n, p = X.shape
+    if method == 'auto':
+        method = 'randomized' if p > EIGH_MAX_COLUMNS and k is not None and k < p // 2 else 'eigh'
+    mean = X.mean(axis=0)
+    scale = X.std(axis=0, ddof=1) if standardize else np.ones(p)
+    scale = np.where(scale == 0, 1, scale)
+    if method == 'eigh':
+        matrix = cov.correlation_matrix(X) if standardize else cov.covariance_matrix(X)
+        return _fit_covariance(np.nan_to_num(matrix), k, mean, scale, columns, n)
+    Z = (X - mean) / scale
+    components, singular_values = _randomized_components(Z, k, oversamples, power_iterations, seed)
+    total_variance = np.sum(Z * Z) / (n - 1)
+    return _result(components, singular_values ** 2 / (n - 1), total_variance, mean, scale, columns, n)
+
+
+def fit_moments(moments, k=None, standardize=True, columns=None):
+    # a fit from the running moments of a CovarianceAccumulator, memory is O(p^2) however many rows it saw
+    scale = moments.std() if standardize else np.ones(len(moments.mean))
+    matrix = moments.correlation() if standardize else moments.covariance()
+    columns = list(range(len(moments.mean))) if columns is None else list(columns)
+    return _fit_covariance(matrix, k, moments.mean, np.where(scale == 0, 1, scale), columns, moments.n)
+
+
+def fit_incremental(chunks, k=None, standardize=True):
+    # fit to an iterable of row chunks (arrays or DataFrames) folded into the moments one at a time
+    moments = columns = None
+    for chunk in chunks:
+        values, chunk_columns = _numeric(chunk)
+        if moments is None:
+            moments, columns = CovarianceAccumulator(values.shape[1]), chunk_columns
+        moments.update(values)
+    return fit_moments(moments, k, standardize, columns)
+
+
+def transform(pca, data, k=None):
+    X, _ = _numeric(data)
+    components = pca.components if k is None else pca.components[:k]
+    return (X - pca.mean) / pca.scale @ components.T
+
+
+def cached_fit(name, standardize=True):
+    return FITS_CACHE.get_or_compute((name, standardize), lambda: fit(datasets.load(name), standardize=standardize))
@@ -0,0 +1,62 @@
+import os
+from collections import namedtuple
+
+import numpy as np
+from scipy import stats
+
+from backend import instrument, sampling
+from backend.cache import LRUCache
+from backend.sampling import MAX_CHUNK_DRAWS
+
+FisherSummary = namedtuple('FisherSummary', ['rho', 'mean', 'std', 'fisher_mean', 'fisher_std'])
+
+# simulated correlations shared across every session of this process
+CORRELATIONS_CACHE = LRUCache(max_bytes=int(os.environ.get('PEARSON_CACHE_BYTES', 128 * 2 ** 20)),
+                              name='pearson.correlations')
+
+
+def fisher(r):
+    # F(r) = 1/2 ln((1 + r) / (1 - r))
+    return np.arctanh(r)
+
+
+def inverse_fisher(z):
+    return np.tanh(z)
+
+
+def comoment_correlations(comoments):
+    return comoments[:, 0, 1] / np.sqrt(comoments[:, 0, 0] * comoments[:, 1, 1])
+
+
+@instrument.timed
+def simulate_correlations(cov, n, reps, seed=None, max_chunk_draws=MAX_CHUNK_DRAWS):
+    # Correlations of reps samples of n points from a bivariate normal (the means do not change r). Each block
+    # of samples is one tensor of standard normals whose centred co-moments S are summed with einsum, the
+    # points X = Z L^T of the Cholesky factor L of cov then have the co-moments L S L^T. The tensor is laid
+    # out as (rows, 2, n) so both sums run over contiguous memory.
+    cholesky = np.linalg.cholesky(np.asarray(cov, dtype=float))
+    out = np.empty(reps)
+    for start, stop, rng in sampling.iter_blocks(reps, 2 * n, seed, max_chunk_draws):
+        z = rng.standard_normal((stop - start, 2, n))
+        sums = z.sum(axis=2)
+        comoments = np.einsum('rin,rjn->rij', z, z) - sums[:, :, None] * sums[:, None, :] / n
+        out[start:stop] = comoment_correlations(cholesky @ comoments @ cholesky.T)
+    return out
+
+
+def cached_correlations(cov, n, reps, seed):
+    key = tuple(np.asarray(cov, dtype=float).ravel()), n, reps, seed
+    return CORRELATIONS_CACHE.get_or_compute(key, lambda: simulate_correlations(cov, n, reps, seed))
+
+
+def fisher_summary(correlations, rho, n):
+    # the transformed correlations next to Fisher's N(F(rho), 1 / sqrt(n - 3))
+    z = fisher(correlations)
+    return FisherSummary(rho, z.mean(), z.std(ddof=1), fisher(rho), 1 / np.sqrt(n - 3))
+
+
+def confidence_interval(r, n, confidence=0.95):
+    # F(rho) in F(r) +- z_(1 - alpha/2) / sqrt(n - 3), mapped back to the correlation scale
+    half_width = stats.norm.ppf(1 - (1 - confidence) / 2) / np.sqrt(n - 3)
+    z = fisher(r)
+    return inverse_fisher(z - half_width), inverse_fisher(z + half_width)
@@ -0,0 +1,111 @@
+import os
+import threading
+from os import path
+
+import numpy as np
+from scipy.stats import binom, hypergeom, geom, nbinom, poisson
+
+TABLES_PATH = os.environ.get('PMF_TABLES_PATH',
+                             path.join(path.dirname(path.dirname(__file__)), '.cache', 'pmf_tables'))
+
+# The parameter grids match the sliders on the Common Distributions page. Each table has one axis per
+# parameter followed by the support, where the first support column is k = offset(*params). The supports
+# are long enough to hold the plotted range (see dist.support) for every point on the grid.
+TABLES = {
+    'Binomial': dict(
+        grids=(np.arange(0, 31), np.linspace(0, 1, 101)),
+        support_len=31,
+        offset=lambda n, p: 0,
+        pmf=lambda k, n, p: binom.pmf(k, n, p),
+    ),
+    'Hypergeometric': dict(
+        grids=(np.arange(50, 101), np.arange(0, 51), np.arange(0, 51)),
+        support_len=51,
+        offset=lambda M, n, N: 0,
+        pmf=lambda k, M, n, N: hypergeom.pmf(k, M, n, N),
+    ),
+    'Geometric': dict(
+        grids=(np.linspace(0, 1, 21),),
+        support_len=300,
+        offset=lambda p: 1,
+        pmf=lambda k, p: geom.pmf(k + 1, p),
+    ),
+    'NegativeBinomial': dict(
+        grids=(np.arange(1, 51), np.linspace(0, 1, 21)),
+        support_len=1800,
+        offset=lambda n, p: n,
+        pmf=lambda k, n, p: nbinom.pmf(k, n, p),
+    ),
+    'Poisson': dict(
+        grids=(np.linspace(1, 20, 191),),
+        support_len=50,
+        offset=lambda rate: 0,
+        pmf=lambda k, rate: poisson.pmf(k, rate),
+    ),
+}
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def table_file(name):
+    return path.join(TABLES_PATH, f'{name}.npy')
+
+
+def compute_table(name):
+    spec = TABLES[name]
+    n_params = len(spec['grids'])
+    # a single broadcast call over every parameter combination and the whole support
+    params = np.meshgrid(*spec['grids'], indexing='ij')
+    params = [param[..., np.newaxis] for param in params]
+    k = np.arange(spec['support_len']).reshape((1,) * n_params + (-1,))
+    with np.errstate(all='ignore'):
+        return spec['pmf'](k, *params).astype(np.float32)
+
+
+def build(tables_path=TABLES_PATH):
+    os.makedirs(tables_path, exist_ok=True)
+    for name in TABLES:
+        table = compute_table(name)
+        np.save(path.join(tables_path, f'{name}.npy'), table)
+        print(f'{name}: {table.shape} ({table.nbytes / 2 ** 20:.1f} MiB)')
+
+
+def load_table(name):
+    with _tables_lock:
+        if name not in _tables:
+            table = None
+            if path.exists(table_file(name)):
+                table = np.load(table_file(name), mmap_mode='r')
+                expected = tuple(len(grid) for grid in TABLES[name]['grids']) + (TABLES[name]['support_len'],)
+                if table.shape != expected:
+                    table = None
+            _tables[name] = table
+        return _tables[name]
+
+
+def _grid_index(grid, value):
+    i = int(np.searchsorted(grid, value))
+    for j in (i - 1, i):
+        if 0 <= j < len(grid) and abs(grid[j] - value) < 1e-9:
+            return j
+    return None
+
+
+def lookup(name, k, *params):
+    # the precomputed pmf at k, or None when the table is missing or the parameters are off its grid
+    table = load_table(name)
+    if table is None:
+        return None
+    spec = TABLES[name]
+    index = tuple(_grid_index(grid, param) for grid, param in zip(spec['grids'], params))
+    if None in index:
+        return None
+    cols = np.asarray(k) - spec['offset'](*params)
+    if len(cols) and (cols.min() < 0 or cols.max() >= spec['support_len']):
+        return None
+    return table[index][cols]
+
+
+if __name__ == '__main__':
+    build()
@@ -0,0 +1,56 @@
+import sys
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# upper bound on the number of draws (or multinomial cells) held in memory at once
+MAX_CHUNK_DRAWS = 2 ** 22
+# rows are drawn in fixed blocks that are each seeded independently
+BLOCK_ROWS = 2 ** 16
+
+
+def blocks(n_rows, row_draws, max_chunk_draws=MAX_CHUNK_DRAWS, block_rows=BLOCK_ROWS):
+    # (start, stop) of consecutive blocks of rows, each needing at most max_chunk_draws draws
+    block_rows = max(1, min(block_rows, max_chunk_draws // max(row_draws, 1)))
+    return [(start, min(start + block_rows, n_rows)) for start in range(0, n_rows, block_rows)]
+
+
+def block_seeds(seed, n_blocks):
+    # every block gets its own child seed, so a result does not depend on how the blocks are scheduled
+    return np.random.SeedSequence(seed).spawn(n_blocks)
+
+
+def iter_blocks(n_rows, row_draws, seed=None, max_chunk_draws=MAX_CHUNK_DRAWS):
+    # (start, stop, generator) for every block of rows
+    row_blocks = blocks(n_rows, row_draws, max_chunk_draws)
+    for (start, stop), block_seed in zip(row_blocks, block_seeds(seed, len(row_blocks))):
+        yield start, stop, np.random.default_rng(block_seed)
+
+
+def simulate_block(dist_vals, probs, sample_size, use_counts, seed, out):
+    # the means of len(out) samples of sample_size draws, from the counts of each value when use_counts
+    rng = np.random.default_rng(seed)
+    if use_counts:
+        counts = rng.multinomial(sample_size, probs, size=len(out))
+        np.matmul(counts, dist_vals, out=out)
+        out /= sample_size
+    else:
+        samples = rng.choice(dist_vals, p=probs, size=(len(out), sample_size))
+        samples.mean(axis=1, out=out)
+
+
+def _attach_shared_memory(name):
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+
+def simulate_shared_block(shm_name, n_samples, start, stop, dist_vals, probs, sample_size, use_counts, seed):
+    # the target of the clt process pool, it lives here so spawned workers only import numpy
+    shm = _attach_shared_memory(shm_name)
+    try:
+        means = np.ndarray(n_samples, buffer=shm.buf)
+        simulate_block(dist_vals, probs, sample_size, use_counts, seed, means[start:stop])
+        del means
+    finally:
+        shm.close()
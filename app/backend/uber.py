@@ -0,0 +1,144 @@
+import glob
+import os
+import threading
+from collections import namedtuple
+from os import path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from backend import datasets, instrument
+
+UBER_PATH = path.join(datasets.DATA_PATH, 'Uber-dataset')
+CACHE_PATH = path.join(datasets.CACHE_PATH, 'uber')
+TIME_FORMAT = '%m/%d/%Y %H:%M:%S'
+SECONDS_PER_HOUR = 3600
+SECONDS_PER_DAY = 24 * SECONDS_PER_HOUR
+# side of a grid cell in degrees, about 500m of latitude
+CELL_SIZE = 0.005
+
+# counts: sparse (day * 24 + hour, cell) trip counts, first_day: days since epoch of row 0,
+# origin: (lat, lon) of the grid's corner, shape: (lat cells, lon cells)
+TripIndex = namedtuple('TripIndex', ['counts', 'first_day', 'n_days', 'origin', 'cell_size', 'shape'])
+
+_loaded = {}
+_indexes = {}
+_lock = threading.Lock()
+
+
+def month_files(uber_path=UBER_PATH):
+    # every monthly trip file, plain or zipped, e.g. uber-raw-data-apr14.csv.zip
+    return sorted(glob.glob(path.join(uber_path, 'uber-raw-data-*.csv*')))
+
+
+def month_name(file_path):
+    return path.basename(file_path).split('.')[0].removeprefix('uber-raw-data-')
+
+
+def parse(file_path):
+    # Vectorized parse of one monthly file: the timestamps are converted in one call with a fixed
+    # format instead of row by row, coordinates are kept in float32 and the base as a categorical.
+    df = pd.read_csv(file_path, dtype={'Lat': np.float32, 'Lon': np.float32, 'Base': 'category'})
+    epoch = pd.to_datetime(df['Date/Time'], format=TIME_FORMAT).to_numpy('datetime64[s]').astype(np.int64)
+    return pd.DataFrame({
+        'epoch': epoch,
+        # days since 1970-01-01 and hour of the day, both ready for grouping and bincount
+        'day': (epoch // SECONDS_PER_DAY).astype(np.int32),
+        'hour': (epoch % SECONDS_PER_DAY // SECONDS_PER_HOUR).astype(np.uint8),
+        'Lat': df['Lat'],
+        'Lon': df['Lon'],
+        'Base': df['Base'],
+    })
+
+
+def convert(file_path):
+    # each month has its own cache directory keyed by its checksum, so adding a month or replacing one
+    # file only parses that file
+    directory = path.join(CACHE_PATH, month_name(file_path),
+                          f'v{datasets.FORMAT_VERSION}-{datasets.checksum(file_path)[:16]}')
+    if not path.exists(path.join(directory, 'meta.json')):
+        os.makedirs(path.dirname(directory), exist_ok=True)
+        datasets.write_columns(parse(file_path), directory, dict(source=path.basename(file_path)))
+    return directory
+
+
+def load_month(file_path):
+    with _lock:
+        if file_path not in _loaded:
+            _loaded[file_path] = datasets.read_columns(convert(file_path))
+        return _loaded[file_path]
+
+
+def _concat(frames):
+    if len(frames) == 1:
+        return frames[0]
+    data = {column: np.concatenate([df[column].to_numpy() for df in frames])
+            for column in frames[0].columns if column != 'Base'}
+    # months can have different sets of bases, union_categoricals keeps the result categorical
+    data['Base'] = pd.api.types.union_categoricals([df['Base'].array for df in frames])
+    return pd.DataFrame(data, columns=frames[0].columns, copy=False)
+
+
+def load(months=None, uber_path=UBER_PATH):
+    # trips of the given months (all of them by default), oldest first
+    files = month_files(uber_path)
+    if months is not None:
+        files = [file_path for file_path in files if month_name(file_path) in months]
+    if not files:
+        raise FileNotFoundError(f'No uber trip files for {months or "any month"} in {uber_path}')
+    return _concat([load_month(file_path) for file_path in files])
+
+
+@instrument.timed
+def build_index(df, cell_size=CELL_SIZE):
+    # (date, hour, cell) counts in one pass: every trip gets a flat row and cell number and the
+    # duplicates are summed when the coo matrix is converted to csr
+    lat, lon = df['Lat'].to_numpy(), df['Lon'].to_numpy()
+    origin = float(lat.min()), float(lon.min())
+    lat_cells = ((lat - origin[0]) / cell_size).astype(np.int64)
+    lon_cells = ((lon - origin[1]) / cell_size).astype(np.int64)
+    shape = int(lat_cells.max()) + 1, int(lon_cells.max()) + 1
+    day = df['day'].to_numpy()
+    first_day = int(day.min())
+    n_days = int(day.max()) - first_day + 1
+    rows = (day - first_day).astype(np.int64) * 24 + df['hour'].to_numpy()
+    counts = sparse.coo_matrix((np.ones(len(rows), dtype=np.int32), (rows, lat_cells * shape[1] + lon_cells)),
+                               shape=(n_days * 24, shape[0] * shape[1])).tocsr()
+    return TripIndex(counts, first_day, n_days, origin, cell_size, shape)
+
+
+def trip_index(months=None, cell_size=CELL_SIZE):
+    key = tuple(months) if months is not None else None, cell_size
+    with _lock:
+        if key in _indexes:
+            return _indexes[key]
+    index = build_index(load(months), cell_size)
+    with _lock:
+        return _indexes.setdefault(key, index)
+
+
+def dates(index):
+    return pd.to_datetime(np.arange(index.first_day, index.first_day + index.n_days), unit='D').date
+
+
+@instrument.timed
+def window(index, days=None, hours=None):
+    # Trips per cell of the days (offsets from the first day) and hours of the day given, a slice of the
+    # sparse rows summed up. Returns a frame of the non empty cells' centres and counts.
+    days = np.arange(index.n_days) if days is None else np.atleast_1d(days)
+    hours = np.arange(24) if hours is None else np.atleast_1d(hours)
+    rows = (days[:, None] * 24 + hours[None, :]).ravel()
+    counts = np.asarray(index.counts[rows].sum(axis=0)).ravel()
+    cells = np.flatnonzero(counts)
+    lat_cells, lon_cells = np.divmod(cells, index.shape[1])
+    return pd.DataFrame({
+        'Lat': index.origin[0] + (lat_cells + 0.5) * index.cell_size,
+        'Lon': index.origin[1] + (lon_cells + 0.5) * index.cell_size,
+        'trips': counts[cells],
+    })
+
+
+if __name__ == '__main__':
+    for month_file in month_files():
+        print(f'{month_name(month_file)}: {convert(month_file)}')
@@ -0,0 +1,133 @@
+import os
+from collections import namedtuple
+
+import numpy as np
+from scipy import special, stats
+
+from backend import instrument, sampling
+from backend.cache import LRUCache
+from backend.sampling import MAX_CHUNK_DRAWS
+
+N_PERMUTATIONS = 100_000
+# the counts grow past the float64 range for groups of a few hundred each, they are kept as
+# counts * exp(log_scale) and scaled down by 2^-RESCALE_BITS whenever one passes 2^RESCALE_BITS
+RESCALE_BITS = 800
+
+RankSumResult = namedtuple('RankSumResult', ['statistic', 'u', 'pvalue', 'method'])
+# counts: of U = 0, 1, ... up to where the table has been computed so far, scaled by exp(log_scale)
+NullCounts = namedtuple('NullCounts', ['counts', 'log_scale'])
+
+# the lower halves of the null distributions by (smaller group size, larger group size), shared across
+# every session and extended to larger values of U as p-values need them
+NULL_CACHE = LRUCache(max_bytes=int(os.environ.get('WILCOXON_CACHE_BYTES', 128 * 2 ** 20)),
+                      name='wilcoxon.null_distributions')
+
+
+def _sigma(m, n, size):
+    # sigma(k) = sum of the divisors d of k with d <= m minus those with n < d <= m + n
+    sigma = np.zeros(size)
+    for d in range(1, min(m, size - 1) + 1):
+        sigma[d::d] += d
+    for d in range(n + 1, min(n + m, size - 1) + 1):
+        sigma[d::d] -= d
+    return sigma
+
+
+def _extend(null, m, n, stop):
+    # Loffler's recurrence for the number of arrangements c(u) with U = u, the one scipy's exact test uses:
+    # u c(u) = sum_{i<u} c(i) sigma(u - i). Each new count is one dot product with the reversed sigma.
+    counts = np.zeros(stop)
+    log_scale = 0.0
+    start = 1
+    if null is None:
+        counts[0] = 1.0
+    else:
+        counts[:len(null.counts)], log_scale, start = null.counts, null.log_scale, len(null.counts)
+    reversed_sigma = _sigma(m, n, stop)[::-1].copy()
+    limit, factor = 2.0 ** RESCALE_BITS, 2.0 ** -RESCALE_BITS
+    for u in range(start, stop):
+        counts[u] = np.dot(counts[:u], reversed_sigma[stop - 1 - u:stop - 1]) / u
+        if counts[u] > limit:
+            counts[:u + 1] *= factor
+            log_scale += RESCALE_BITS * np.log(2)
+    return NullCounts(counts, log_scale)
+
+
+def lower_pmf(n1, n2, stop):
+    # P(U = u) for u = 0..stop - 1 (at most up to the centre n1 n2 / 2)
+    m, n = sorted((n1, n2))
+    stop = min(stop, m * n // 2 + 1)
+    null = NULL_CACHE.get((m, n))
+    if null is None or len(null.counts) < stop:
+        null = NULL_CACHE.put((m, n), _extend(null, m, n, stop))
+    log_total = special.gammaln(m + n + 1) - special.gammaln(m + 1) - special.gammaln(n + 1)
+    return null.counts[:stop] * np.exp(null.log_scale - log_total)
+
+
+@instrument.timed
+def null_distribution(n1, n2):
+    # P(U = u) for u = 0..n1 * n2 where U = (rank sum of the first group) - n1 (n1 + 1) / 2 under H0
+    lower = lower_pmf(n1, n2, n1 * n2 // 2 + 1)
+    return np.concatenate([lower, lower[:n1 * n2 + 1 - len(lower)][::-1]])
+
+
+def _cdf(u, n1, n2):
+    # P(U <= u), the distribution is symmetric so only its lower half is ever computed
+    k = int(np.floor(u))
+    if k < 0:
+        return 0.0
+    if 2 * k >= n1 * n2:
+        return 1.0 - _cdf(n1 * n2 - k - 1, n1, n2)
+    pmf = lower_pmf(n1, n2, k + 1)
+    if not np.isfinite(pmf).all():
+        raise ValueError(f'The exact null distribution of U for groups of {n1} and {n2} is not finite.')
+    return pmf.sum()
+
+
+@instrument.timed
+def exact_pvalue(u, n1, n2, alternative='two-sided'):
+    less, greater = _cdf(u, n1, n2), _cdf(n1 * n2 - u, n1, n2)
+    if alternative == 'less':
+        return less
+    if alternative == 'greater':
+        return greater
+    return min(1.0, 2 * min(less, greater))
+
+
+@instrument.timed
+def permutation_pvalue(ranks, n1, alternative='two-sided', n_permutations=N_PERMUTATIONS, seed=None,
+                       max_chunk_draws=MAX_CHUNK_DRAWS):
+    # Share of random relabellings at least as extreme as the observed rank sum of the first n1 ranks,
+    # evaluated for blocks of permutations at a time. Used when ties make the exact null invalid.
+    ranks = np.asarray(ranks, dtype=float)
+    observed = ranks[:n1].sum()
+    expected = n1 * (len(ranks) + 1) / 2
+    # rank sums are multiples of 0.5, the tolerance keeps equal sums equal after floating point sums
+    tolerance = 1e-9 * len(ranks)
+    extreme = 0
+    for start, stop, rng in sampling.iter_blocks(n_permutations, len(ranks), seed, max_chunk_draws):
+        sums = rng.permuted(np.broadcast_to(ranks, (stop - start, len(ranks))), axis=1)[:, :n1].sum(axis=1)
+        if alternative == 'less':
+            extreme += np.count_nonzero(sums <= observed + tolerance)
+        elif alternative == 'greater':
+            extreme += np.count_nonzero(sums >= observed - tolerance)
+        else:
+            extreme += np.count_nonzero(np.abs(sums - expected) >= abs(observed - expected) - tolerance)
+    return (extreme + 1) / (n_permutations + 1)
+
+
+def rank_sum_test(x, y, alternative='two-sided', method='auto', n_permutations=N_PERMUTATIONS, seed=None):
+    # Wilcoxon rank sum test of x against y. 'exact' uses the null distribution of U, 'permutation' relabels
+    # the ranks at random, 'auto' picks the exact test unless there are ties.
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    ranks = stats.rankdata(np.concatenate([x, y]))
+    statistic = ranks[:len(x)].sum()
+    u = statistic - len(x) * (len(x) + 1) / 2
+    if method == 'auto':
+        method = 'permutation' if len(np.unique(ranks)) < len(ranks) else 'exact'
+    if method == 'exact':
+        pvalue = exact_pvalue(u, len(x), len(y), alternative)
+    else:
+        pvalue = permutation_pvalue(ranks, len(x), alternative, n_permutations, seed)
+    return RankSumResult(statistic, u, pvalue, method)
+
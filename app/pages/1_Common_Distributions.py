@@ -1,6 +1,6 @@
 import streamlit as st
 
-from backend import dist
+from backend import dist, instrument
 
 st.set_page_config(page_title='Data Science & Stats', page_icon='📉', layout='wide')
 
@@ -29,11 +29,12 @@ c.markdown('$V(X) = \\frac{(b - a + 1)^2 - 1}{12}$')
 
 
 @st.fragment()
+@instrument.timed(name='page.uniform_distribution')
 def uniform_distribution():
     a, b = st.columns(2)
     start = a.slider('a', min_value=1, max_value=5, value=1)
     end = b.slider('b', min_value=6, max_value=10, value=6)
-    st.pyplot(dist.Uniform.plot_dist(start, end))
+    st.image(dist.render(dist.Uniform, start, end), width='stretch')
 
 
 uniform_distribution()
@@ -51,11 +52,12 @@ c.markdown('$V(X) = np(1-p)$')
 
 
 @st.fragment()
+@instrument.timed(name='page.binomial_distribution')
 def binomial_distribution():
     a, b = st.columns(2)
     n = a.slider('n', min_value=0, max_value=30, value=15)
     p = b.slider('p', min_value=0.0, max_value=1.0, value=0.5)
-    st.pyplot(dist.Binomial.plot_dist(n, p))
+    st.image(dist.render(dist.Binomial, n, p), width='stretch')
 
 
 binomial_distribution()
@@ -75,12 +77,13 @@ c.markdown('$V(X) = \\frac{M-N}{M-1}N\\frac{n}{M}(1 - \\frac{n}{M})$')
 
 
 @st.fragment()
+@instrument.timed(name='page.hypergeometric_distribution')
 def hypergeometric_distribution():
     a, b, c = st.columns(3)
     M = a.slider('M', min_value=50, max_value=100, value=50)
     n = b.slider('n', min_value=0, max_value=50, value=30)
     N = c.slider('N', min_value=0, max_value=50, value=30)
-    st.pyplot(dist.Hypergeometric.plot_dist(M, n, N))
+    st.image(dist.render(dist.Hypergeometric, M, n, N), width='stretch')
 
 
 hypergeometric_distribution()
@@ -100,9 +103,10 @@ c.markdown('$V(X) = \\frac{1-p}{p^2}$')
 
 
 @st.fragment()
+@instrument.timed(name='page.geometric_distribution')
 def geometric_distribution():
     p = st.slider('p', min_value=0.0, max_value=1.0, value=0.5, step=0.05)
-    st.pyplot(dist.Geometric.plot_dist(p))
+    st.image(dist.render(dist.Geometric, p), width='stretch')
 
 
 geometric_distribution()
@@ -122,11 +126,12 @@ c.markdown('$V(X) = n\\frac{1-p}{p^2}$')
 
 
 @st.fragment()
+@instrument.timed(name='page.negative_binomial_distribution')
 def negative_binomial_distribution():
     a, b = st.columns(2)
     n = a.slider('n', min_value=1, max_value=50)
     p = b.slider('p', min_value=0.0, max_value=1.0, value=0.5, step=0.05, key='nbp')
-    st.pyplot(dist.NegativeBinomial.plot_dist(n, p))
+    st.image(dist.render(dist.NegativeBinomial, n, p), width='stretch')
 
 
 negative_binomial_distribution()
@@ -145,9 +150,10 @@ c.markdown('$V(X) = \lambda$')
 
 
 @st.fragment()
+@instrument.timed(name='page.poisson_distribution')
 def poisson_distribution():
     rate = st.slider('λ', min_value=1.0, max_value=20.0, step=0.1)
-    st.pyplot(dist.Poisson.plot_dist(rate))
+    st.image(dist.render(dist.Poisson, rate), width='stretch')
 
 
 poisson_distribution()
@@ -157,3 +163,5 @@ st.markdown('''
 ## Continuous Distributions
 ---
 ''')
+
+instrument.debug_panel()
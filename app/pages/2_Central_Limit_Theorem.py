@@ -1,7 +1,10 @@
+import time
+from contextlib import closing
+
 import pandas as pd
 import streamlit as st
 
-from backend import clt
+from backend import clt, instrument
 
 st.set_page_config(page_title='Data Science & Stats', page_icon='📉', layout='wide')
 
@@ -12,7 +15,9 @@ st.markdown('''>**The central theorem limit states that for *almost* any distrib
 >of size n that as we increase the sample size n, the distribution of the sample
 >means will look more and more normal.**''')
 
-n_dist_values = 20
+REDRAW_INTERVAL = 0.25
+
+n_dist_values = clt.N_DIST_VALUES
 st.subheader(f'Create a random distribution from {n_dist_values} distinct possible values')
 if not clt.is_init():
     clt.init()
@@ -32,26 +37,47 @@ st.button('Clear', on_click=clt.clear_distribution)
 st.markdown('---')
 a, b = st.columns(2)
 sample_size = int(a.slider('Sample size', min_value=1, max_value=100, value=5, step=1))
-n_samples = int(b.slider('Number of samples', min_value=100, max_value=10_000, value=1000, step=100))
+n_samples = int(b.slider('Number of samples', min_value=100, max_value=1_000_000, value=1000, step=100))
+a, b = st.columns(2)
+exact = a.toggle('Exact distribution', help='Compute the exact distribution of the sample means '
+                                            'instead of simulating the samples.')
+b.button('Resample', on_click=clt.resample, disabled=exact, help='Draw a new set of samples.')
 
 if clt.has_distribution():
-    with st.spinner(f'Generating {n_samples} sample means'):
-        clt.generate_sample_means(sample_size, n_samples)
     a, b = st.columns(2)
-    with a:
-        fig = clt.plotly_distribution_chart(clt.sample_means(), 'Sample Means',
-                                            f'Distribution of {len(clt.sample_means())} sample means '
-                                            f'using sample size {sample_size}.')
-        st.plotly_chart(fig)
-    with b:
-        fig = clt.plotly_distribution_chart(clt.std_sample_means(), 'Standardized Sample Means',
-                                            f'Standardized Distribution of {len(clt.sample_means())} '
-                                            f'sample means using sample size {sample_size}.')
-        st.plotly_chart(fig)
+    chart, std_chart = a.empty(), b.empty()
+    if exact:
+        clt.generate_exact_sample_means(sample_size)
+        description = f'sample means using sample size {sample_size}.'
+    else:
+        progress_bar = st.progress(0.0, text=f'Generating {n_samples} sample means')
+        last_redraw = time.monotonic()
+        # a rerun triggered by a new slider value raises out of this loop, which closes the stream
+        # and cancels whatever is left of the simulation
+        with closing(clt.stream_sample_means(sample_size, n_samples)) as stream:
+            for progress in stream:
+                progress_bar.progress(len(progress.means) / n_samples, text=f'Generating {n_samples} sample means')
+                if time.monotonic() - last_redraw > REDRAW_INTERVAL:
+                    fig, std_fig = clt.plotly_progress_charts(progress, sample_size)
+                    chart.plotly_chart(fig)
+                    std_chart.plotly_chart(std_fig)
+                    last_redraw = time.monotonic()
+        progress_bar.empty()
+        description = f'{len(clt.sample_means())} sample means using sample size {sample_size}.'
+    fig = clt.plotly_distribution_chart(clt.sample_means(), 'Sample Means',
+                                        f'{"Exact d" if exact else "D"}istribution of {description}',
+                                        pmf=clt.sample_means_pmf())
+    chart.plotly_chart(fig)
+    fig = clt.plotly_distribution_chart(clt.std_sample_means(), 'Standardized Sample Means',
+                                        f'Standardized {"Exact " if exact else ""}Distribution of {description}',
+                                        pmf=clt.sample_means_pmf())
+    std_chart.plotly_chart(fig)
 
     theoretical_mean, theoretical_std = clt.get_theoretical_sample_means_mean(), clt.get_theoretical_sample_means_std()
-    actual_mean, actual_std = clt.sample_means().mean(), clt.sample_means().std()
+    actual_mean, actual_std = clt.get_sample_means_mean(), clt.get_sample_means_std()
     st.dataframe(pd.DataFrame({'Theoretical': [theoretical_mean, theoretical_std],
                                'Actual': [actual_mean, actual_std],
                                'Gap': [abs(theoretical_mean - actual_mean), abs(theoretical_std - actual_std)]},
                               index=['Mean', 'Standard Deviation']))
+
+instrument.debug_panel()
@@ -5,13 +5,26 @@ import pandas as pd
 import seaborn as sns
 import streamlit as st
 
-from backend import cov
+from backend import cov, datasets, density, images, instrument
 
-IMAGES_PATH = path.join(path.dirname(path.dirname(__file__)), 'images')
+IMAGES_PATH = images.IMAGES_PATH
 DATA_POINTS = 200
 
 st.set_page_config(page_title='Data Science & Stats', page_icon='📉', layout='wide')
 
+
+def heatmap(corr, image):
+    # images rendered at build time by backend.images, drawn live when they have not been built
+    image_path = path.join(IMAGES_PATH, image)
+    if path.exists(image_path):
+        st.image(image_path)
+        return
+    fig = plt.figure()
+    sns.heatmap(corr, vmin=-1, vmax=1, cmap='ocean', annot=True, linewidths=1, linecolor='k')
+    st.pyplot(fig)
+    plt.close(fig)
+
+
 st.header('Covariance and Correlation')
 
 
@@ -128,6 +141,7 @@ as you choose the trend and scale of the randomly generated data.
 
 
 @st.fragment()
+@instrument.timed(name='page.cov_corr_graphs')
 def cov_corr_graphs():
     a, b = st.columns(2)
     slope = a.slider('Trend', min_value=-10, max_value=10, value=-10, help='The general slope of the data.')
@@ -144,6 +158,38 @@ def cov_corr_graphs():
 
 cov_corr_graphs()
 
+st.markdown('''
+---
+### Many more points
+
+With hundreds of thousands of points a scatter plot turns into a solid blob that takes a long time to draw.
+Instead we can count how many points fall into each cell of a grid and color every cell by its count.
+The covariance and correlation are computed from all the points just the same.
+''')
+
+
+@st.fragment()
+@instrument.timed(name='page.density_graph')
+def density_graph():
+    a, b, c = st.columns(3)
+    n_points = a.select_slider('Points', options=[10_000, 100_000, 1_000_000, 5_000_000], value=1_000_000)
+    slope = b.slider('Trend', min_value=-10, max_value=10, value=5, key='density_trend')
+    scale = c.slider('Scale', min_value=0, max_value=50, value=20, key='density_scale')
+    x = np.random.uniform(0, 10, n_points)
+    y = slope * x + np.random.normal(0, scale, n_points)
+    fig = plt.figure(figsize=(10, 5))
+    plt.title(f'Cov = {cov.covariance(x, y):.3f} | Corr = {cov.correlation(x, y):.3f}')
+    # the trend line over x in [0, 10] and four standard deviations of noise either side of it
+    margin = max(4 * scale, 1)
+    extent = (0, 10, min(0, 10 * slope) - margin, max(0, 10 * slope) + margin)
+    image = density.density_plot(x, y, extent=extent, line_kws={'color': 'black'})
+    plt.colorbar(image, label='Points')
+    st.pyplot(fig)
+    plt.close(fig)
+
+
+density_graph()
+
 ############################################################################################################
 
 st.markdown('''
@@ -158,7 +204,7 @@ in Antarctica. The dataset measures bill length, bill depth, flipper length, and
 Male and Female penguins. We'll use a couple techniques to visualize the data and see which features are
 correlated, if any at all.
 ''')
-penguins = sns.load_dataset('penguins').dropna().reset_index(drop=True)
+penguins = datasets.load('penguins')
 a, b = st.columns(2)
 a.dataframe(penguins)
 a.markdown('''
@@ -178,7 +224,7 @@ For larger datasets we can create a **Correlation Matrix** to display a heatmap
 between all the variables** in a much less expensive way.
 ''')
 
-penguin_corr = penguins.corr(numeric_only=True)
+penguin_corr = cov.correlation_matrix(penguins)
 a, b = st.columns(2)
 with a:
     st.title('The correlation matrix')
@@ -186,9 +232,7 @@ with a:
     st.markdown('''
     **remember! The correlation matrix describes the correlation between every pair of variables in the dataset.**''')
 with b:
-    fig = plt.figure()
-    sns.heatmap(penguin_corr, vmin=-1, vmax=1, cmap='ocean', annot=True, linewidths=1, linecolor='k')
-    st.pyplot(fig)
+    heatmap(penguin_corr, 'penguins-heatmap.png')
 
 st.markdown('''From the heatmap it looks like bill depth and flipper length or bill depth and body mass
 are negatively correlated; but if you look at the pairplot above again, what we really see is 3
@@ -196,16 +240,16 @@ distinct species of penguins where bill depth and flipper length/body mass are a
 positively correlated. We can see this if we view their individual heatmaps''')
 
 
+species_corr = cov.grouped_correlation(penguins, 'species')
+
+
 @st.fragment()
+@instrument.timed(name='page.species_heatmap')
 def species_heatmap():
-    species = penguins.species.unique()
     a, b = st.columns(2)
     with a:
-        spec = st.selectbox('Species', options=species)
-        spec_df = penguins[penguins.species == spec]
-        fig = plt.figure()
-        sns.heatmap(spec_df.corr(numeric_only=True), vmin=-1, vmax=1, cmap='ocean', annot=True, linewidths=1, linecolor='k')
-        st.pyplot(fig)
+        spec = st.selectbox('Species', options=list(species_corr))
+        heatmap(species_corr[spec], f'{spec}-heatmap.png')
     with b:
         st.image(path.join(IMAGES_PATH, f'{spec}-pairplot.png'))
 
@@ -217,3 +261,5 @@ Even though the first heatmap showed some features had a seemingly negative corr
 by massaging the data and trying to visualize it as many ways as possible can we start to get
 the whole picture of what's really going on.''')
 st.image(path.join(IMAGES_PATH, 'penguins-pairplot-species.png'), width='content')
+
+instrument.debug_panel()
@@ -0,0 +1,50 @@
+import numpy as np
+import plotly.express as px
+import streamlit as st
+
+from backend import instrument, uber
+
+st.set_page_config(page_title='Data Science & Stats', page_icon='📉', layout='wide')
+
+st.header('Uber Trips in New York')
+
+st.markdown('''
+Every Uber pickup in New York City during April 2014, over half a million trips.
+
+The trips are counted once per day, hour and small square of the city ahead of time,
+so any window of days and hours is just a sum of those counts and the map updates as soon as the sliders move.
+''')
+
+index = uber.trip_index()
+dates = uber.dates(index)
+# trips per (day, hour), the row sums of the index
+hourly = np.asarray(index.counts.sum(axis=1)).reshape(index.n_days, 24)
+
+
+@st.fragment()
+@instrument.timed(name='page.trips_map')
+def trips_map():
+    a, b = st.columns(2)
+    first, last = a.select_slider('Days', options=list(dates), value=(dates[0], dates[-1]),
+                                  format_func=lambda date: date.strftime('%b %d'))
+    start, end = b.slider('Hours', min_value=0, max_value=23, value=(0, 23))
+    days = np.arange(list(dates).index(first), list(dates).index(last) + 1)
+    hours = np.arange(start, end + 1)
+
+    cells = uber.window(index, days, hours)
+    st.markdown(f'**{cells.trips.sum():,}** trips in **{len(cells):,}** squares')
+    fig = px.density_map(cells, lat='Lat', lon='Lon', z='trips', radius=8, zoom=10, height=600,
+                         center=dict(lat=40.73, lon=-73.97), map_style='carto-positron')
+    fig.update_layout(margin=dict(l=0, r=0, t=0, b=0))
+    st.plotly_chart(fig, width='stretch')
+
+    by_hour = hourly[days].sum(axis=0)
+    fig = px.bar(x=np.arange(24), y=by_hour, labels=dict(x='Hour', y='Trips'), title='Trips per hour')
+    fig.update_traces(marker_color=np.where((np.arange(24) >= start) & (np.arange(24) <= end),
+                                            '#636efa', '#c8c8c8'))
+    st.plotly_chart(fig, width='stretch')
+
+
+trips_map()
+
+instrument.debug_panel()
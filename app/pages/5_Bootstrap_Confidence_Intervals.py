@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+from scipy import stats
+
+from backend import bootstrap, datasets, instrument
+
+st.set_page_config(page_title='Data Science & Stats', page_icon='📉', layout='wide')
+
+HISTOGRAM_BINS = 100
+
+# dataset -> (columns resampled together, statistics that make sense for them)
+SAMPLES = {
+    'salaries_extended': (['Salaries'], ['mean', 'median', 'std']),
+    'salaries_popvar_unknown': (['Salaries'], ['mean', 'median', 'std']),
+    'mean_diff_dependent': (['Before', 'After'], ['mean difference']),
+}
+
+st.header('Bootstrap Confidence Intervals')
+
+st.markdown('''
+A confidence interval for the mean of a normal population has a closed form, $\\bar{x} \\pm t_{\\alpha/2, n-1} \\frac{s}{\\sqrt{n}}$.
+Most other statistics, like the median, don't have one.
+
+The bootstrap treats the sample as if it were the population: draw many samples of the same size from it
+*with replacement*, compute the statistic of each one and use the spread of those statistics.
+
+- **Percentile interval**: the $\\alpha/2$ and $1-\\alpha/2$ quantiles of the bootstrap statistics.
+- **BCa interval**: the same quantiles shifted to correct for the bias and skew of the bootstrap distribution.
+''')
+
+a, b = st.columns(2)
+name = a.selectbox('Dataset', list(SAMPLES))
+columns, statistics = SAMPLES[name]
+statistic = b.selectbox('Statistic', statistics)
+a, b = st.columns(2)
+n_resamples = int(a.select_slider('Resamples', options=[1_000, 10_000, 100_000, 1_000_000], value=100_000))
+confidence = b.slider('Confidence level', min_value=0.80, max_value=0.99, value=0.95, step=0.01)
+
+df = datasets.load(name)
+data = df[columns].to_numpy(dtype=float)
+data = data[:, 0] if len(columns) == 1 else data
+st.dataframe(df[columns].T)
+
+result = bootstrap.cached_bootstrap(data, statistic, n_resamples, confidence, seed=0)
+
+counts, edges = np.histogram(result.distribution, bins=HISTOGRAM_BINS)
+fig = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts / counts.sum(), width=np.diff(edges),
+                       marker_color='lightgrey', name='Bootstrap statistics'))
+for label, (low, high), color in [('Percentile', result.percentile, 'blue'), ('BCa', result.bca, 'red')]:
+    for x in (low, high):
+        fig.add_vline(x=x, line_color=color, line_dash='dash')
+    fig.add_trace(go.Scatter(x=[None], y=[None], mode='lines', line=dict(color=color, dash='dash'), name=label))
+fig.add_vline(x=result.statistic, line_color='black')
+fig.update_layout(title=f'Bootstrap distribution of the {statistic} ({n_resamples:,} resamples)',
+                  xaxis_title=statistic.capitalize(), yaxis_title='Proportion', bargap=0)
+st.plotly_chart(fig)
+
+intervals = {'Percentile': result.percentile, 'BCa': result.bca}
+if statistic in ('mean', 'mean difference'):
+    # the closed form t interval for comparison
+    values = data if data.ndim == 1 else data[:, 1] - data[:, 0]
+    intervals['t'] = stats.t.interval(confidence, len(values) - 1, values.mean(), stats.sem(values))
+st.dataframe(pd.DataFrame(intervals, index=['Lower', 'Upper']).T.assign(Width=lambda t: t.Upper - t.Lower))
+st.markdown(f'Observed {statistic}: **{result.statistic:,.3f}**, bootstrap standard error: '
+            f'**{result.standard_error:,.3f}**')
+
+instrument.debug_panel()
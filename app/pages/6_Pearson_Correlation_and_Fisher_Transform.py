@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+from scipy import stats
+
+from backend import instrument, pearson
+
+st.set_page_config(page_title='Data Science & Stats', page_icon='📉', layout='wide')
+
+HISTOGRAM_BINS = 100
+
+
+def histogram_chart(values, title, xaxis_title, pdf=None):
+    counts, edges = np.histogram(values, bins=HISTOGRAM_BINS)
+    centers = (edges[:-1] + edges[1:]) / 2
+    fig = go.Figure(go.Bar(x=centers, y=counts / (counts.sum() * np.diff(edges)), width=np.diff(edges),
+                           marker_color='lightblue', name='Simulated'))
+    if pdf is not None:
+        fig.add_trace(go.Scatter(x=centers, y=pdf(centers), mode='lines', line_color='red', name='Fisher'))
+    fig.update_layout(title=title, xaxis_title=xaxis_title, yaxis_title='Density', bargap=0)
+    return fig
+
+
+st.header("The Sampling Distribution of Pearson's r and the Fisher Transform")
+
+st.markdown('''
+Draw $n$ points from a bivariate normal distribution with covariance matrix $\\Sigma$ and compute their correlation $\\hat{\\rho}_n$.
+Repeating this many times gives the sampling distribution of $\\hat{\\rho}_n$, which is *almost* normal but skewed
+away from $\\pm 1$.
+
+The Fisher transform $F(r) = \\frac{1}{2}\\ln(\\frac{1+r}{1-r})$ makes it normal, with mean $F(\\rho)$ and
+standard deviation $\\frac{1}{\\sqrt{n-3}}$.
+''')
+
+a, b, c = st.columns(3)
+var_x = a.slider('V(X)', min_value=0.1, max_value=2.0, value=0.8, step=0.1)
+var_y = b.slider('V(Y)', min_value=0.1, max_value=2.0, value=0.4, step=0.1)
+rho = c.slider('Correlation', min_value=-0.95, max_value=0.95, value=0.88, step=0.01)
+cov = np.array([[var_x, rho * np.sqrt(var_x * var_y)], [rho * np.sqrt(var_x * var_y), var_y]])
+a, b = st.columns(2)
+n = int(a.slider('Points per sample', min_value=4, max_value=500, value=100))
+reps = int(b.select_slider('Samples', options=[1_000, 10_000, 100_000, 1_000_000], value=100_000))
+
+st.markdown(f'$\\Sigma = \\begin{{bmatrix}} {cov[0, 0]:.2f} & {cov[0, 1]:.2f} \\\\ '
+            f'{cov[1, 0]:.2f} & {cov[1, 1]:.2f} \\end{{bmatrix}}$')
+
+with st.spinner(f'Drawing {reps:,} samples of {n} points'):
+    correlations = pearson.cached_correlations(cov, n, reps, seed=0)
+summary = pearson.fisher_summary(correlations, rho, n)
+
+a, b = st.columns(2)
+a.plotly_chart(histogram_chart(correlations, f'Distribution of {reps:,} sample correlations', 'Correlation'))
+b.plotly_chart(histogram_chart(pearson.fisher(correlations), f'Distribution of {reps:,} transformed correlations',
+                               'F(r)', pdf=stats.norm(summary.fisher_mean, summary.fisher_std).pdf))
+st.dataframe(pd.DataFrame({'Fisher': [summary.fisher_mean, summary.fisher_std],
+                           'Simulated': [summary.mean, summary.std]}, index=['Mean', 'Standard Deviation']))
+
+st.markdown('''
+---
+### Confidence interval for $\\rho$
+
+Since $F(\\hat\\rho_n)$ is normal, a confidence interval for $F(\\rho)$ is $F(\\hat\\rho_n) \\pm \\frac{1}{\\sqrt{n-3}}\\Phi^{-1}(1 - 0.5\\alpha)$,
+and applying the inverse transform $F^{-1}(z) = \\tanh(z)$ to both ends gives one for $\\rho$.
+The share of the simulated samples whose interval contains $\\rho$ should be close to the confidence level.
+''')
+
+confidence = st.slider('Confidence level', min_value=0.80, max_value=0.99, value=0.95, step=0.01)
+lower, upper = pearson.confidence_interval(correlations, n, confidence)
+coverage = np.mean((lower <= rho) & (rho <= upper))
+st.markdown(f'The first sample has $\\hat\\rho_{{{n}}} = {correlations[0]:.3f}$ and the interval '
+            f'**({lower[0]:.3f}, {upper[0]:.3f})**. '
+            f'**{coverage:.2%}** of the {reps:,} intervals contain $\\rho = {rho}$.')
+
+instrument.debug_panel()
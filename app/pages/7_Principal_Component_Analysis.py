@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
+
+from backend import datasets, instrument, pca
+
+st.set_page_config(page_title='Data Science & Stats', page_icon='📉', layout='wide')
+
+# dataset -> column used to label the points
+LABELS = {
+    'mtcars': 'model',
+    'penguins': 'species',
+}
+
+st.header('Principal Component Analysis')
+
+st.markdown('''
+PCA reduces the number of dimensions (features) of a dataset by projecting it into a lower dimensional space
+that keeps as much of the variance as possible.
+
+The directions of that space are the eigenvectors of the correlation matrix (or the covariance matrix when the columns
+are not standardized), ordered by their eigenvalues. Each eigenvalue is the variance of the data along its eigenvector,
+so its share of the sum of all the eigenvalues is the share of the variance that component explains.
+''')
+
+a, b = st.columns(2)
+name = a.selectbox('Dataset', list(LABELS))
+standardize = b.toggle('Standardize the columns', value=True,
+                       help='Decompose the correlation matrix instead of the covariance matrix.')
+
+df = datasets.load(name)
+fit = pca.cached_fit(name, standardize)
+n_components = len(fit.explained_variance)
+labels = [f'PC{i}' for i in range(1, n_components + 1)]
+
+explained = fit.explained_variance_ratio * 100
+fig = go.Figure([go.Bar(x=labels, y=explained, name='% explained'),
+                 go.Scatter(x=labels, y=explained.cumsum(), mode='lines+markers', name='cumulative %')])
+fig.update_layout(title='% of the variance explained by each component', yaxis_title='Percentage',
+                  yaxis_range=[0, 105])
+st.plotly_chart(fig)
+
+k = st.slider('Components to keep', min_value=1, max_value=n_components,
+              value=int(np.searchsorted(explained.cumsum(), 95)) + 1)
+st.markdown(f'Keeping **{k}** of the {n_components} dimensions retains **{explained[:k].sum():.1f}%** of the variance.')
+
+a, b = st.columns(2)
+loadings = pd.DataFrame(fit.components[:k].T, index=fit.columns, columns=labels[:k])
+a.plotly_chart(px.imshow(loadings, color_continuous_scale='RdBu', zmin=-1, zmax=1, aspect='auto',
+                         title='Loadings of the kept components'))
+
+projected = pd.DataFrame(pca.transform(fit, df, max(k, 2))[:, :2], columns=labels[:2])
+projected[LABELS[name]] = df[LABELS[name]].to_numpy()
+categorical = df[LABELS[name]].nunique() < 10
+b.plotly_chart(px.scatter(projected, x='PC1', y='PC2', color=LABELS[name] if categorical else None,
+                          hover_name=LABELS[name], title='The data projected onto the first two components'))
+
+instrument.debug_panel()
@@ -0,0 +1,157 @@
+import argparse
+import fnmatch
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+REPO_PATH = os.path.dirname(BENCHMARKS_PATH)
+HISTORY_PATH = os.environ.get('BENCHMARKS_HISTORY_PATH', os.path.join(BENCHMARKS_PATH, 'history.json'))
+THRESHOLDS_PATH = os.path.join(BENCHMARKS_PATH, 'thresholds.json')
+
+# the backend is imported the same way the app does, from the app directory
+sys.path.insert(0, os.path.join(REPO_PATH, 'app'))
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+from benchmarks.cases import all_cases  # noqa: E402
+
+
+def measure(fn, repeats, budget):
+    # Wall time of repeated runs (after one warm up run), then a single run under tracemalloc for the peak
+    # traced memory and the number of memory blocks still allocated once it returns (its result included).
+    fn()
+    times = []
+    start = time.perf_counter()
+    while len(times) < repeats and (not times or time.perf_counter() - start < budget):
+        gc.collect()
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del result
+    retained = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+    times.sort()
+    return dict(time=times[0], time_median=times[len(times) // 2], repeats=len(times), peak_bytes=peak,
+                retained_blocks=retained)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_PATH, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _environment():
+    import numpy
+    import scipy
+    return dict(python=platform.python_version(), numpy=numpy.__version__, scipy=scipy.__version__,
+                machine=platform.machine(), processor=platform.processor(), cpus=os.cpu_count())
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def thresholds_for(name, thresholds):
+    # the default limits updated by every pattern that matches the case name, in file order
+    limits = dict(thresholds['default'])
+    for pattern, overrides in thresholds.get('cases', {}).items():
+        if fnmatch.fnmatchcase(name, pattern):
+            limits.update(overrides)
+    return limits
+
+
+def regressions(results, baseline, thresholds):
+    # (case, metric, baseline value, new value, ratio) for every metric past its limit
+    found = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        limits = thresholds_for(name, thresholds)
+        for metric in ('time', 'peak_bytes'):
+            old, new = baseline[name][metric], result[metric]
+            # differences below the noise floor are never regressions
+            if new - old <= limits[f'{metric}_floor']:
+                continue
+            ratio = new / old if old else float('inf')
+            if ratio > limits[metric]:
+                found.append((name, metric, old, new, ratio))
+    return found
+
+
+def _format(metric, value):
+    return f'{value * 1000:,.2f} ms' if metric == 'time' else f'{value / 2 ** 20:,.2f} MiB'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description='Time the backend hot paths and compare with a previous run.')
+    parser.add_argument('-k', '--filter', default='*', help='only run the cases matching this glob')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per case')
+    parser.add_argument('--budget', type=float, default=2.0, help='stop repeating a case after this many seconds')
+    parser.add_argument('--label', help='name of this run in the history, e.g. baseline')
+    parser.add_argument('--baseline', help='label of the run to compare against, the last run by default')
+    parser.add_argument('--history', default=HISTORY_PATH)
+    parser.add_argument('--no-save', action='store_true', help='do not add this run to the history')
+    parser.add_argument('--list', action='store_true', help='list the cases and exit')
+    args = parser.parse_args(argv)
+
+    pattern = args.filter if any(c in args.filter for c in '*?[') else f'*{args.filter}*'
+    cases = [case for case in all_cases() if fnmatch.fnmatchcase(case.name, pattern)]
+    if args.list:
+        print('\n'.join(case.name for case in cases))
+        return 0
+
+    history = load_history(args.history)
+    baseline_runs = [run for run in history if args.baseline is None or run.get('label') == args.baseline]
+    if args.baseline is not None and not baseline_runs:
+        parser.error(f'no run labelled {args.baseline!r} in {args.history}')
+    baseline = baseline_runs[-1]['results'] if baseline_runs else {}
+
+    results = {}
+    for case in cases:
+        result = measure(case.setup(), args.repeat, args.budget)
+        results[case.name] = result
+        change = ''
+        if case.name in baseline:
+            change = f'{result["time"] / baseline[case.name]["time"] - 1:+7.1%}'
+        print(f'{case.name:<80} {_format("time", result["time"]):>14} {change:>8} '
+              f'{_format("peak_bytes", result["peak_bytes"]):>14} {result["retained_blocks"]:>8,} blocks', flush=True)
+
+    with open(THRESHOLDS_PATH) as f:
+        thresholds = json.load(f)
+    found = regressions(results, baseline, thresholds)
+
+    if not args.no_save:
+        history.append(dict(label=args.label, commit=_git_commit(),
+                            date=datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                            environment=_environment(), results=results))
+        with open(args.history, 'w') as f:
+            json.dump(history, f, indent=2)
+
+    for name, metric, old, new, ratio in found:
+        print(f'REGRESSION {name} {metric}: {_format(metric, old)} -> {_format(metric, new)} ({ratio:.2f}x)')
+    return 1 if found else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
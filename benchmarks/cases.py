@@ -0,0 +1,173 @@
+import functools
+import itertools
+import os
+from collections import namedtuple
+
+import numpy as np
+
+# name: unique id of the case and its parameters, setup: builds the inputs (not timed) and returns
+# the zero argument function that is timed
+Case = namedtuple('Case', ['name', 'setup'])
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+
+
+def sweep(name, make, **grid):
+    # one case for every combination of the grid's values
+    for values in itertools.product(*grid.values()):
+        params = dict(zip(grid, values))
+        yield Case(f'{name}[{",".join(f"{k}={v}" for k, v in params.items())}]', functools.partial(make, **params))
+
+
+def _distribution(n_values=20, seed=0):
+    probs = np.random.default_rng(seed).random(n_values)
+    return np.arange(1.0, n_values + 1), probs / probs.sum()
+
+
+def _matrix(rows, columns, nan=False, seed=0):
+    X = np.random.default_rng(seed).standard_normal((rows, columns))
+    if nan:
+        X[np.random.default_rng(seed + 1).random(X.shape) < 0.05] = np.nan
+    return X
+
+
+def clt_cases():
+    from backend import clt
+
+    def simulate(sample_size, n_samples):
+        values, probs = _distribution()
+        return lambda: clt.simulate_sample_means(values, probs, sample_size, n_samples, seed=0, n_workers=1)
+
+    def exact(sample_size):
+        values, probs = _distribution()
+        return lambda: clt.exact_sample_mean_pmf(values, probs, sample_size)
+
+    yield from sweep('clt.simulate_sample_means', simulate, sample_size=[5, 50], n_samples=[10_000, 1_000_000])
+    yield from sweep('clt.exact_sample_mean_pmf', exact, sample_size=[10, 100, 1000])
+
+
+def dist_cases():
+    from backend import dist
+
+    # the uncached render, from the pmf over the support to the encoded png
+    def render(distribution, param):
+        cls = getattr(dist, distribution)
+        params = (param, 0.5) if distribution == 'Binomial' else (param,)
+        return lambda: dist._render(cls, params, 'png')
+
+    def support(distribution, param):
+        cls = getattr(dist, distribution)
+        params = (param, 0.5) if distribution == 'Binomial' else (param,)
+        return lambda: cls.pmf(dist.support(cls, *params), *params)
+
+    yield from sweep('dist.render', render, distribution=['Binomial'], param=[10, 100, 10_000])
+    yield from sweep('dist.render', render, distribution=['Poisson'], param=[5, 500])
+    yield from sweep('dist.support_pmf', support, distribution=['Binomial', 'Poisson'],
+                     param=[10, 10_000, 1_000_000])
+
+
+def cov_cases():
+    from backend import cov
+
+    def covariance_matrix(rows, columns, nan):
+        X = _matrix(rows, columns, nan)
+        return lambda: cov.covariance_matrix(X)
+
+    def correlation_matrix(rows, columns):
+        X = _matrix(rows, columns)
+        return lambda: cov.correlation_matrix(X)
+
+    def grouped(rows, columns, groups):
+        X = _matrix(rows, columns)
+        codes = np.random.default_rng(0).integers(0, groups, rows)
+        return lambda: cov.grouped_correlation_matrices(X, codes, groups)
+
+    def accumulator(rows, columns, chunk_rows):
+        X = _matrix(rows, columns)
+        return lambda: functools.reduce(lambda acc, start: acc.update(X[start:start + chunk_rows]),
+                                        range(0, rows, chunk_rows), cov.CovarianceAccumulator(columns))
+
+    yield from sweep('cov.covariance_matrix', covariance_matrix, rows=[10_000], columns=[10, 100, 500],
+                     nan=[False, True])
+    yield from sweep('cov.correlation_matrix', correlation_matrix, rows=[100_000], columns=[10, 100])
+    yield from sweep('cov.grouped_correlation_matrices', grouped, rows=[100_000], columns=[4, 50], groups=[3, 100])
+    yield from sweep('cov.CovarianceAccumulator', accumulator, rows=[1_000_000], columns=[4], chunk_rows=[10_000])
+
+
+def csv_stats_cases():
+    from backend import csv_stats
+
+    def moments(file):
+        path = os.path.join(DATA_PATH, file)
+        return lambda: csv_stats.csv_moments(path, n_workers=1)
+
+    yield from sweep('csv_stats.csv_moments', moments, file=['Uber-dataset/uber-raw-data-apr14.csv.zip'])
+
+
+def bootstrap_cases():
+    from backend import bootstrap
+
+    def resample(statistic, n, n_resamples):
+        data = np.random.default_rng(0).standard_normal(n)
+        return lambda: bootstrap.resample_statistics(data, statistic, n_resamples, seed=0)
+
+    yield from sweep('bootstrap.resample_statistics', resample, statistic=['mean', 'median'], n=[70],
+                     n_resamples=[10_000, 100_000])
+
+
+def pearson_cases():
+    from backend import pearson
+
+    def simulate(n, reps):
+        return lambda: pearson.simulate_correlations([[0.8, 0.5], [0.5, 0.4]], n, reps, seed=0)
+
+    yield from sweep('pearson.simulate_correlations', simulate, n=[20, 100], reps=[10_000, 100_000])
+
+
+def wilcoxon_cases():
+    from backend import wilcoxon
+
+    # from an empty cache, so the whole table is built every time
+    def null_distribution(n):
+        def run():
+            wilcoxon.NULL_CACHE.clear()
+            return wilcoxon.null_distribution(n, n)
+        return run
+
+    def permutation(n, n_permutations):
+        ranks = np.random.default_rng(0).permutation(2 * n) + 1.0
+        return lambda: wilcoxon.permutation_pvalue(ranks, n, n_permutations=n_permutations, seed=0)
+
+    yield from sweep('wilcoxon.null_distribution', null_distribution, n=[50, 150, 300])
+    yield from sweep('wilcoxon.permutation_pvalue', permutation, n=[50], n_permutations=[100_000])
+
+
+def pca_cases():
+    from backend import pca
+
+    def fit(rows, columns, k, method):
+        X = _matrix(rows, columns)
+        return lambda: pca.fit(X, k, method=method, seed=0)
+
+    yield from sweep('pca.fit', fit, rows=[10_000], columns=[10, 200], k=[None], method=['eigh'])
+    yield from sweep('pca.fit', fit, rows=[2_000], columns=[2_000], k=[5], method=['eigh', 'randomized'])
+
+
+def density_cases():
+    from backend import density
+
+    def bin_counts(points, bins):
+        rng = np.random.default_rng(0)
+        x, y = rng.standard_normal(points), rng.standard_normal(points)
+        return lambda: density.bin_counts(x, y, bins)
+
+    yield from sweep('density.bin_counts', bin_counts, points=[100_000, 5_000_000], bins=[200])
+
+
+SUITES = [clt_cases, dist_cases, cov_cases, csv_stats_cases, bootstrap_cases, pearson_cases, wilcoxon_cases,
+          pca_cases, density_cases]
+
+
+def all_cases():
+    for suite in SUITES:
+        yield from suite()